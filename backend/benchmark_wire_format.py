@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes-on-wire and CPU per reply chunk for each WebSocket wire format.
+
+permessage-deflate is simulated the way RFC 7692 frames it: a shared zlib
+stream per connection (context takeover), sync-flushed after each message,
+with the trailing 0x00 0x00 0xff 0xff removed.
+
+Usage:
+    python benchmark_wire_format.py [--chunks N]
+"""
+
+import argparse
+import time
+import uuid
+import zlib
+from datetime import datetime
+from models import WebSocketMessage
+from wire_format import JsonCodec, CompactCodec, MessagePackCodec, msgpack
+
+SAMPLE_REPLY = (
+    "Sure! Here is a short explanation of how WebSockets work. The client opens "
+    "an HTTP connection and asks the server to upgrade it. Once the server agrees, "
+    "both sides can send frames at any time over the same TCP connection, which "
+    "makes it a good fit for streaming replies token by token. "
+)
+
+class PerMessageDeflate:
+    """Simulated permessage-deflate compressor with context takeover."""
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    def compress(self, frame: bytes) -> bytes:
+        data = self.compressor.compress(frame)
+        data += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-4]
+
+def build_chunks(count: int) -> list:
+    """Build reply chunk messages resembling a streamed completion."""
+    words = SAMPLE_REPLY.split(" ")
+    stream_id = str(uuid.uuid4())
+    conversation_id = f"conv-{int(time.time() * 1000)}"
+    return [
+        WebSocketMessage(
+            type="message",
+            data={
+                "content": words[i % len(words)] + " ",
+                "is_complete": False,
+                "timestamp": datetime.now().isoformat(),
+                "stream_id": stream_id,
+                "stream_index": 1,
+                "seq": i + 1
+            },
+            conversation_id=conversation_id
+        )
+        for i in range(count)
+    ]
+
+def run_mode(name: str, codec, chunks: list, deflate: bool) -> tuple:
+    """Encode all chunks with a codec and return (name, bytes/chunk, us/chunk)."""
+    compressor = PerMessageDeflate() if deflate else None
+    total_bytes = 0
+
+    start = time.perf_counter()
+    for message in chunks:
+        frame = codec.encode(message)
+        if isinstance(frame, str):
+            frame = frame.encode("utf-8")
+        if compressor:
+            frame = compressor.compress(frame)
+        total_bytes += len(frame)
+    elapsed = time.perf_counter() - start
+
+    return name, total_bytes / len(chunks), elapsed / len(chunks) * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000, help="Number of chunks to encode")
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.chunks)
+    compact = CompactCodec(compression_threshold=0)
+
+    modes = [
+        ("json", JsonCodec(), False),
+        ("json + permessage-deflate", JsonCodec(), True),
+        ("compact", compact, False),
+        ("compact + permessage-deflate", compact, True),
+    ]
+    if msgpack is not None:
+        modes += [
+            ("msgpack", MessagePackCodec(), False),
+            ("msgpack + permessage-deflate", MessagePackCodec(), True),
+        ]
+
+    print(f"{'mode':<32}{'bytes/chunk':>14}{'us/chunk':>12}")
+    print("-" * 58)
+    for name, codec, deflate in modes:
+        name, size, cpu = run_mode(name, codec, chunks, deflate)
+        print(f"{name:<32}{size:>14.1f}{cpu:>12.2f}")
+
+if __name__ == "__main__":
+    main()
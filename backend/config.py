@@ -11,10 +11,68 @@ class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
     
+    # Token Usage Configuration
+    USAGE_MAX_TOKENS_PER_REQUEST: int = int(os.getenv("USAGE_MAX_TOKENS_PER_REQUEST", "1000"))
+    USAGE_CONVERSATION_TOKEN_BUDGET: int = int(os.getenv("USAGE_CONVERSATION_TOKEN_BUDGET", "0"))
+    USAGE_CONNECTION_TOKEN_BUDGET: int = int(os.getenv("USAGE_CONNECTION_TOKEN_BUDGET", "0"))
+    USAGE_GLOBAL_TOKEN_BUDGET: int = int(os.getenv("USAGE_GLOBAL_TOKEN_BUDGET", "0"))
+    USAGE_MAX_TRACKED: int = int(os.getenv("USAGE_MAX_TRACKED", "100000"))
+    USAGE_SNAPSHOT_INTERVAL: float = float(os.getenv("USAGE_SNAPSHOT_INTERVAL", "60"))
+    
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     
+    # Production Server Configuration
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "1"))
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "auto")  # "auto", "uvloop" or "asyncio"
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "auto")  # "auto", "httptools" or "h11"
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_KEEP_ALIVE: int = int(os.getenv("SERVER_KEEP_ALIVE", "5"))
+    SERVER_DRAIN_TIMEOUT: float = float(os.getenv("SERVER_DRAIN_TIMEOUT", "30"))
+    SERVER_LOG_LEVEL: str = os.getenv("SERVER_LOG_LEVEL", "info")
+    
+    # Batch Chat Configuration
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+    
+    # Reply Pipeline Configuration
+    REPLY_CHUNKING: str = os.getenv("REPLY_CHUNKING", "none")  # "none", "sentence" or "markdown"
+    REPLY_CHUNK_MAX_BUFFER: int = int(os.getenv("REPLY_CHUNK_MAX_BUFFER", "2000"))
+    REPLY_REDACT: str = os.getenv("REPLY_REDACT", "")  # e.g. "email,api_key,credit_card"
+    REPLY_REDACT_WINDOW: int = int(os.getenv("REPLY_REDACT_WINDOW", "128"))
+    REPLY_MAX_CHARS: int = int(os.getenv("REPLY_MAX_CHARS", "0"))  # 0 disables the cutoff
+    
+    # Prompt Cache Configuration
+    PROMPT_CACHE_ENABLED: bool = os.getenv("PROMPT_CACHE_ENABLED", "false").lower() == "true"
+    PROMPT_CACHE_MAX_ENTRIES: int = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "10000"))
+    PROMPT_CACHE_THRESHOLD: float = float(os.getenv("PROMPT_CACHE_THRESHOLD", "0.85"))
+    PROMPT_CACHE_NUM_PERM: int = int(os.getenv("PROMPT_CACHE_NUM_PERM", "64"))
+    PROMPT_CACHE_BANDS: int = int(os.getenv("PROMPT_CACHE_BANDS", "16"))
+    PROMPT_CACHE_SHINGLE_SIZE: int = int(os.getenv("PROMPT_CACHE_SHINGLE_SIZE", "4"))
+    PROMPT_CACHE_MAX_CANDIDATES: int = int(os.getenv("PROMPT_CACHE_MAX_CANDIDATES", "32"))
+    PROMPT_CACHE_MAX_BUCKET_SCAN: int = int(os.getenv("PROMPT_CACHE_MAX_BUCKET_SCAN", "64"))
+    PROMPT_CACHE_MIN_CHARS: int = int(os.getenv("PROMPT_CACHE_MIN_CHARS", "8"))
+    PROMPT_CACHE_MAX_CHARS: int = int(os.getenv("PROMPT_CACHE_MAX_CHARS", "300"))
+    
+    # WebSocket Wire Format Configuration
+    WS_PER_MESSAGE_DEFLATE: bool = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    WS_COMPRESSION_THRESHOLD: int = int(os.getenv("WS_COMPRESSION_THRESHOLD", "512"))
+    WS_COMPRESSION_LEVEL: int = int(os.getenv("WS_COMPRESSION_LEVEL", "6"))
+    WS_MAX_CONCURRENT_STREAMS: int = int(os.getenv("WS_MAX_CONCURRENT_STREAMS", "4"))
+    WS_MAX_ACTIVE_STREAMS: int = int(os.getenv("WS_MAX_ACTIVE_STREAMS", "256"))
+    
+    # Stream Resume Configuration
+    STREAM_BUFFER_MAX_CHUNKS: int = int(os.getenv("STREAM_BUFFER_MAX_CHUNKS", "2000"))
+    STREAM_RESUME_GRACE_SECONDS: float = float(os.getenv("STREAM_RESUME_GRACE_SECONDS", "60"))
+    
+    # Logging Configuration
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", "256"))
+    LOG_RATE_LIMIT_BURST: int = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
+    LOG_RATE_LIMIT_INTERVAL: float = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "10"))
+    
     # CORS Configuration
     CORS_ORIGINS: list = [
         "http://localhost:3000",
@@ -0,0 +1,235 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, TextIO, Tuple
+from config import settings
+
+# Context fields copied from `extra=` onto each JSON line when present
+CONTEXT_FIELDS = ("connection_id", "conversation_id", "stream_id", "suppressed")
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record as a JSON line.
+
+        Args:
+            record: The log record
+
+        Returns:
+            str: The JSON-encoded record
+        """
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits repetitive warnings and errors to a burst per interval.
+
+    Records are keyed by logger and message template, so e.g. send failures
+    for many different connections share one budget. Records below min_level,
+    such as connection lifecycle info, are never limited. The first record let
+    through after suppression carries the number of records dropped, and
+    total_suppressed counts every drop, including those never followed by a
+    later record of the same key.
+    """
+
+    def __init__(self, burst: int = None, interval: float = None, min_level: int = logging.WARNING):
+        """
+        Initialize the filter.
+
+        Args:
+            burst: Records allowed per key in each interval
+            interval: Length of the rate-limit window in seconds
+            min_level: Lowest level that is rate limited
+        """
+        super().__init__()
+        self.burst = burst or settings.LOG_RATE_LIMIT_BURST
+        self.interval = interval or settings.LOG_RATE_LIMIT_INTERVAL
+        self.min_level = min_level
+        # key -> [window start, records seen in window, records suppressed]
+        self.windows: Dict[Tuple[str, str], List] = {}
+        self.total_suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return False for records over the budget of their key."""
+        if record.levelno < self.min_level:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            window = self.windows[key] = [now, 0, 0]
+            if suppressed:
+                record.suppressed = suppressed
+
+        window[1] += 1
+        if window[1] > self.burst:
+            window[2] += 1
+            self.total_suppressed += 1
+            return False
+        return True
+
+class NonBlockingQueueHandler(logging.Handler):
+    """Hands records to a bounded queue without ever blocking the caller."""
+
+    def __init__(self, log_queue: queue.Queue):
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue: Queue drained by the background writer
+        """
+        super().__init__()
+        self.queue = log_queue
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord):
+        """Enqueue a record, dropping it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchLogWriter(threading.Thread):
+    """Background thread that formats queued records and writes them in batches."""
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        stream: TextIO = None,
+        formatter: logging.Formatter = None,
+        batch_size: int = None
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            log_queue: Queue of records to write
+            stream: Output stream; defaults to stdout
+            formatter: Formatter applied to each record
+            batch_size: Maximum records written per flush
+        """
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.stream = stream or sys.stdout
+        self.formatter = formatter or JsonFormatter()
+        self.batch_size = batch_size or settings.LOG_BATCH_SIZE
+
+    def run(self):
+        """Drain the queue until stopped, writing each batch with a single flush."""
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    stopping = True
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    continue
+
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+
+    def stop(self):
+        """Write any queued records and stop the thread."""
+        self.queue.put(self._STOP)
+        self.join()
+
+_writer: Optional[BatchLogWriter] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_rate_limit: Optional[RateLimitFilter] = None
+
+def setup_logging(stream: TextIO = None) -> logging.Logger:
+    """
+    Configure the application's "chat" loggers to log JSON lines off the event loop.
+
+    Calling this more than once has no effect.
+
+    Args:
+        stream: Output stream; defaults to stdout
+
+    Returns:
+        logging.Logger: The application's root logger
+    """
+    global _writer, _handler, _rate_limit
+
+    root = logging.getLogger("chat")
+    if _writer is not None:
+        return root
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(log_queue)
+    _rate_limit = RateLimitFilter()
+    _handler.addFilter(_rate_limit)
+
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.propagate = False
+
+    _writer = BatchLogWriter(log_queue, stream)
+    _writer.start()
+    atexit.register(_writer.stop)
+    return root
+
+def get_logging_stats() -> Dict[str, int]:
+    """
+    Get the number of log records lost since logging was set up.
+
+    Returns:
+        Dict[str, int]: Records dropped on a full queue and records suppressed
+            by rate limiting
+    """
+    if _handler is None:
+        return {"dropped": 0, "suppressed": 0}
+    return {
+        "dropped": _handler.dropped,
+        "suppressed": _rate_limit.total_suppressed
+    }
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger in the application's "chat" namespace.
+
+    Args:
+        name: Logger name, e.g. the module
+
+    Returns:
+        logging.Logger: The logger
+    """
+    return logging.getLogger(f"chat.{name}")
@@ -1,15 +1,32 @@
+import asyncio
 import json
 import uuid
 from datetime import datetime
 from typing import Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from config import settings
-from models import ChatRequest, ChatResponse, WebSocketMessage, ConnectionStatus
+from logging_config import setup_logging, get_logger, get_logging_stats
+from models import (
+    ChatRequest,
+    ChatResponse,
+    BatchChatRequest,
+    BatchChatResponse,
+    WebSocketMessage,
+    ConnectionStatus
+)
 from services.chatgpt_service import chatgpt_service
+from services.batch_service import batch_service
+from services.reply_pipeline import create_reply_pipeline, TranscriptBuilder
+from services.usage_tracker import usage_tracker, BudgetExceededError
 from websocket_manager import websocket_manager
+from stream_manager import stream_manager, ReplayStream
+
+# Configure non-blocking structured logging
+setup_logging()
+logger = get_logger("main")
 
 # Create FastAPI app
 app = FastAPI(
@@ -34,11 +51,39 @@ async def startup_event():
         # Validate OpenAI API key
         is_valid = await chatgpt_service.validate_api_key()
         if not is_valid:
-            print("Warning: OpenAI API key validation failed")
+            logger.warning("OpenAI API key validation failed")
         else:
-            print("OpenAI API key validated successfully")
+            logger.info("OpenAI API key validated successfully")
     except Exception as e:
-        print(f"Error during startup: {e}")
+        logger.error("Error during startup: %s", e)
+    
+    # Periodically snapshot token usage for dashboards and the logs; keep a
+    # reference so the task is not garbage-collected and can be cancelled
+    app.state.usage_snapshot_task = None
+    if settings.USAGE_SNAPSHOT_INTERVAL > 0:
+        app.state.usage_snapshot_task = asyncio.create_task(snapshot_usage())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown."""
+    task = getattr(app.state, "usage_snapshot_task", None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+async def snapshot_usage():
+    """Take and log a token usage snapshot every USAGE_SNAPSHOT_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(settings.USAGE_SNAPSHOT_INTERVAL)
+        snapshot = usage_tracker.take_snapshot()
+        logger.info(
+            "Token usage: %d total, %d rejected",
+            snapshot["global"]["total_tokens"],
+            snapshot["rejected_requests"]
+        )
 
 @app.get("/")
 async def root():
@@ -52,11 +97,39 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {
+    health = {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "connections": websocket_manager.get_connection_count()
+        "connections": websocket_manager.get_connection_count(),
+        "streams": stream_manager.get_stream_count(),
+        "logging": get_logging_stats()
     }
+    if chatgpt_service.prompt_cache is not None:
+        health["prompt_cache"] = chatgpt_service.prompt_cache.get_stats()
+    
+    # Report draining so load balancers stop routing to this instance
+    if websocket_manager.draining:
+        health["status"] = "draining"
+        return JSONResponse(status_code=503, content=health)
+    return health
+
+@app.get("/api/usage")
+async def usage_endpoint(conversation_id: Optional[str] = None):
+    """
+    Token usage endpoint.
+    
+    Args:
+        conversation_id: Optional conversation to report instead of the summary
+        
+    Returns:
+        dict: The conversation's usage, or the latest usage snapshot
+    """
+    if conversation_id:
+        return {
+            "conversation_id": conversation_id,
+            **usage_tracker.get_usage(conversation_id=conversation_id)
+        }
+    return usage_tracker.last_snapshot or usage_tracker.take_snapshot()
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
@@ -70,23 +143,97 @@ async def chat_endpoint(request: ChatRequest):
         ChatResponse: The complete response from ChatGPT
     """
     try:
-        # Process the message
-        response_chunks = []
-        async for chunk in chatgpt_service.process_message(request.message):
-            response_chunks.append(chunk)
-        
-        # Combine all chunks
-        full_response = "".join(response_chunks)
+        # Process the message through the reply pipeline
+        transcript = TranscriptBuilder()
+        pipeline = create_reply_pipeline(transcript)
+        async for _ in pipeline.run(chatgpt_service.process_message(
+            request.message, conversation_id=request.conversation_id
+        )):
+            pass
         
         return ChatResponse(
-            message=full_response,
+            message=transcript.text,
             conversation_id=request.conversation_id,
             is_complete=True
         )
         
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/batch", response_model=BatchChatResponse)
+async def chat_batch_endpoint(request: BatchChatRequest, stream: bool = False):
+    """
+    REST API endpoint for processing many chat requests concurrently.
+    
+    Args:
+        request: The batch of chat requests
+        stream: If true, stream NDJSON results as they complete
+        
+    Returns:
+        BatchChatResponse: Results in request order, or an NDJSON stream
+    """
+    if len(request.requests) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds limit of {settings.BATCH_MAX_SIZE}"
+        )
+    
+    if stream:
+        async def ndjson_results():
+            async for result in batch_service.stream_batch(
+                request.requests, request.max_concurrency
+            ):
+                yield result.json() + "\n"
+        
+        return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+    
+    try:
+        results = await batch_service.process_batch(
+            request.requests, request.max_concurrency
+        )
+        return BatchChatResponse(results=results)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def generate_reply(stream: ReplayStream, user_message: str):
+    """
+    Stream a ChatGPT reply into a replay stream.
+    
+    Args:
+        stream: The stream that buffers and delivers the reply
+        user_message: The user's input message
+    """
+    completion = {
+        "content": "",
+        "is_complete": True,
+        "timestamp": None
+    }
+    
+    try:
+        pipeline = create_reply_pipeline()
+        async for chunk in pipeline.run(chatgpt_service.process_message(
+            user_message,
+            conversation_id=stream.conversation_id,
+            connection_id=stream.connection_id
+        )):
+            await stream_manager.publish(stream, {
+                "content": chunk,
+                "is_complete": False,
+                "timestamp": datetime.now().isoformat()
+            })
+    except BudgetExceededError as e:
+        completion["error"] = str(e)
+    except asyncio.CancelledError:
+        completion["cancelled"] = True
+        raise
+    finally:
+        # Send completion message; this also starts the stream's grace period
+        completion["timestamp"] = datetime.now().isoformat()
+        await stream_manager.publish(stream, completion)
+
 @app.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -98,19 +245,26 @@ async def websocket_endpoint(websocket: WebSocket):
     connection_id = None
     conversation_id = None
     
+    # Reject new connections while the server drains for a restart
+    if websocket_manager.draining:
+        await websocket.close(code=1012)
+        return
+    
     try:
         # Accept the connection
         connection_id = await websocket_manager.connect(websocket)
-        print(f"Client connected: {connection_id}")
+        logger.info("Client connected", extra={"connection_id": connection_id})
         
         # Handle incoming messages
         while True:
             # Receive message from client
-            data = await websocket.receive_text()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
             
             try:
-                # Parse the message
-                message_data = json.loads(data)
+                # Parse the message with the connection's negotiated codec
+                message_data = websocket_manager.decode_frame(connection_id, frame)
                 message_type = message_data.get("type", "message")
                 
                 if message_type == "message":
@@ -121,48 +275,130 @@ async def websocket_endpoint(websocket: WebSocket):
                     if not user_message.strip():
                         continue
                     
-                    # Send acknowledgment
-                    await websocket_manager.send_personal_message(
-                        connection_id,
-                        WebSocketMessage(
-                            type="status",
-                            data={"status": "processing", "message": "Processing your message..."},
-                            conversation_id=conversation_id
+                    # Refuse new replies while the server drains for a restart
+                    if websocket_manager.draining:
+                        await websocket_manager.send_personal_message(
+                            connection_id,
+                            WebSocketMessage(
+                                type="error",
+                                data={
+                                    "message": "Server is restarting; reconnect to continue",
+                                    "reconnect": True
+                                },
+                                conversation_id=conversation_id
+                            )
                         )
-                    )
+                        continue
                     
-                    # Process with ChatGPT and stream response
-                    response_text = ""
-                    async for chunk in chatgpt_service.process_message(user_message):
-                        response_text += chunk
-                        
-                        # Send chunk to client
+                    # Limit concurrent replies multiplexed over this connection
+                    if not websocket_manager.has_stream_capacity(connection_id, settings.WS_MAX_CONCURRENT_STREAMS):
                         await websocket_manager.send_personal_message(
                             connection_id,
                             WebSocketMessage(
-                                type="message",
+                                type="error",
                                 data={
-                                    "content": chunk,
-                                    "is_complete": False,
-                                    "timestamp": datetime.now().isoformat()
+                                    "message": "Too many concurrent replies on this connection"
                                 },
                                 conversation_id=conversation_id
                             )
                         )
+                        continue
                     
-                    # Send completion message
+                    # Generations outlive their socket, so also cap them process-wide;
+                    # otherwise reconnecting would bypass the per-connection limit
+                    if websocket_manager.get_active_stream_count() >= settings.WS_MAX_ACTIVE_STREAMS:
+                        await websocket_manager.send_personal_message(
+                            connection_id,
+                            WebSocketMessage(
+                                type="error",
+                                data={
+                                    "message": "Server is busy; try again shortly"
+                                },
+                                conversation_id=conversation_id
+                            )
+                        )
+                        continue
+                    
+                    stream = stream_manager.create_stream(connection_id, conversation_id)
+                    
+                    # Send acknowledgment
                     await websocket_manager.send_personal_message(
                         connection_id,
                         WebSocketMessage(
-                            type="message",
+                            type="status",
                             data={
-                                "content": "",
-                                "is_complete": True,
-                                "timestamp": datetime.now().isoformat()
+                                "status": "processing",
+                                "message": "Processing your message...",
+                                "stream_id": stream.stream_id,
+                                "stream_index": stream.stream_index
                             },
                             conversation_id=conversation_id
                         )
                     )
+                    
+                    # Generate in the background so several replies can stream
+                    # concurrently; the task outlives this socket so the reply
+                    # keeps filling the replay buffer if the client drops
+                    websocket_manager.start_stream(
+                        connection_id,
+                        stream.stream_id,
+                        generate_reply(stream, user_message)
+                    )
+                
+                elif message_type == "resume":
+                    # Handle a reconnecting client continuing an in-flight reply
+                    stream_id = message_data.get("stream_id")
+                    last_seq = int(message_data.get("last_seq", 0))
+                    
+                    # Taking over a running reply counts against this connection's limit
+                    if not websocket_manager.has_stream_capacity(
+                        connection_id, settings.WS_MAX_CONCURRENT_STREAMS, stream_id
+                    ):
+                        await websocket_manager.send_personal_message(
+                            connection_id,
+                            WebSocketMessage(
+                                type="error",
+                                data={
+                                    "message": "Too many concurrent replies on this connection",
+                                    "stream_id": stream_id
+                                },
+                                conversation_id=conversation_id
+                            )
+                        )
+                        continue
+                    
+                    resumed = await stream_manager.resume(stream_id, connection_id, last_seq)
+                    if resumed:
+                        websocket_manager.attach_stream(connection_id, stream_id)
+                    else:
+                        await websocket_manager.send_personal_message(
+                            connection_id,
+                            WebSocketMessage(
+                                type="error",
+                                data={
+                                    "message": "Stream not found or expired",
+                                    "stream_id": stream_id
+                                },
+                                conversation_id=conversation_id
+                            )
+                        )
+                
+                elif message_type == "cancel":
+                    # Handle cancellation of a single in-flight reply
+                    stream_id = message_data.get("stream_id")
+                    
+                    if not websocket_manager.cancel_stream(connection_id, stream_id):
+                        await websocket_manager.send_personal_message(
+                            connection_id,
+                            WebSocketMessage(
+                                type="error",
+                                data={
+                                    "message": "No active reply to cancel",
+                                    "stream_id": stream_id
+                                },
+                                conversation_id=conversation_id
+                            )
+                        )
                 
                 elif message_type == "ping":
                     # Handle ping for connection keep-alive
@@ -198,16 +434,22 @@ async def websocket_endpoint(websocket: WebSocket):
                 )
     
     except WebSocketDisconnect:
-        print(f"Client disconnected: {connection_id}")
+        logger.info(
+            "Client disconnected",
+            extra={"connection_id": connection_id, "conversation_id": conversation_id}
+        )
     
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.error(
+            "WebSocket error: %s", e,
+            extra={"connection_id": connection_id, "conversation_id": conversation_id}
+        )
     
     finally:
         # Clean up connection
         if connection_id:
             await websocket_manager.disconnect(connection_id)
-            print(f"Cleaned up connection: {connection_id}")
+            logger.debug("Cleaned up connection", extra={"connection_id": connection_id})
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -223,5 +465,6 @@ if __name__ == "__main__":
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True
+        reload=True,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
     ) 
\ No newline at end of file
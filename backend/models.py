@@ -26,6 +26,22 @@ class ChatResponse(BaseModel):
     is_complete: bool = False
     error: Optional[str] = None
 
+class BatchChatRequest(BaseModel):
+    """Model for a batch of chat requests processed concurrently."""
+    requests: List[ChatRequest] = Field(..., min_length=1)
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
+class BatchChatResult(BaseModel):
+    """Model for the result of a single item in a batch."""
+    index: int
+    message: Optional[str] = None
+    conversation_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    """Model for batch chat response, ordered like the request."""
+    results: List[BatchChatResult]
+
 class WebSocketMessage(BaseModel):
     """Model for WebSocket messages."""
     type: str  # "message", "error", "status"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Production server for the ChatGPT WebSocket Chat Backend.
+
+Runs uvicorn without auto-reload, with worker count, event loop, HTTP parser
+and socket tuning taken from config.Settings. On SIGTERM each worker drains:
+it stops accepting connections, tells connected clients to reconnect
+elsewhere, and lets in-flight replies finish. The whole shutdown, including
+uvicorn's own graceful close, is bounded by SERVER_DRAIN_TIMEOUT.
+"""
+
+import asyncio
+import logging
+import socket
+from typing import List, Optional
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains active WebSocket replies before shutting down."""
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        """
+        Drain in-flight replies, then run the regular uvicorn shutdown.
+
+        Args:
+            sockets: Listening sockets shared with the supervisor, if any
+        """
+        # Stop accepting new connections before waiting on existing ones
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        if not self.force_exit:
+            # uvicorn's own graceful shutdown only gets what the drain left over,
+            # so the whole shutdown stays within SERVER_DRAIN_TIMEOUT
+            self.config.timeout_graceful_shutdown = await self.drain()
+
+        await super().shutdown(sockets)
+
+    async def drain(self) -> float:
+        """
+        Wait for active generations to finish, up to the drain deadline.
+
+        Returns:
+            float: Seconds left before the deadline
+        """
+        # Imported here so the manager is the one loaded by this worker's app
+        from websocket_manager import websocket_manager
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.SERVER_DRAIN_TIMEOUT
+
+        # A client that stopped reading must not hold up the drain
+        try:
+            await asyncio.wait_for(websocket_manager.begin_drain(), timeout=settings.SERVER_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Drain notice not delivered to every client before the deadline")
+
+        if websocket_manager.get_active_stream_count():
+            logger.info(
+                "Draining %s active reply stream(s). (CTRL+C to force quit)",
+                websocket_manager.get_active_stream_count()
+            )
+
+        while (
+            websocket_manager.get_active_stream_count()
+            and not self.force_exit
+            and loop.time() < deadline
+        ):
+            await asyncio.sleep(0.1)
+
+        remaining = websocket_manager.get_active_stream_count()
+        if remaining:
+            logger.warning("Drain deadline exceeded with %s reply stream(s) active", remaining)
+        return max(0.0, deadline - loop.time())
+
+def build_config() -> uvicorn.Config:
+    """
+    Build the uvicorn configuration from application settings.
+
+    Returns:
+        uvicorn.Config: The production server configuration
+    """
+    return uvicorn.Config(
+        "main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.SERVER_WORKERS,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_DRAIN_TIMEOUT,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+        log_level=settings.SERVER_LOG_LEVEL
+    )
+
+def run():
+    """Run the production server, supervising workers when more than one is configured."""
+    config = build_config()
+    server = DrainingServer(config=config)
+
+    if config.workers > 1:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+if __name__ == "__main__":
+    print("🤖 Starting ChatGPT WebSocket Chat Backend (production)...")
+    print(f"📍 Listening on: http://{settings.HOST}:{settings.PORT}")
+    print(f"⚙️  Workers: {settings.SERVER_WORKERS}, loop: {settings.SERVER_LOOP}, http: {settings.SERVER_HTTP}")
+    print(f"🛑 Drain timeout: {settings.SERVER_DRAIN_TIMEOUT}s")
+    print("=" * 50)
+
+    run()
@@ -0,0 +1,133 @@
+import asyncio
+from typing import AsyncGenerator, Optional
+from config import settings
+from models import ChatRequest, BatchChatResult
+from services.chatgpt_service import chatgpt_service
+from services.reply_pipeline import create_reply_pipeline, TranscriptBuilder
+
+class BatchChatService:
+    """Service for running many chat requests concurrently with bounded parallelism."""
+
+    def __init__(self, chat_service, max_concurrency: int = None):
+        """
+        Initialize the batch service.
+
+        Args:
+            chat_service: Service exposing an async-generator process_message
+            max_concurrency: Upper bound on requests in flight at once
+        """
+        self.chat_service = chat_service
+        self.max_concurrency = max_concurrency or settings.BATCH_MAX_CONCURRENCY
+
+    def _resolve_concurrency(self, requested: Optional[int], total: int) -> int:
+        """Clamp the requested concurrency to the configured limit and batch size."""
+        limit = self.max_concurrency
+        if requested:
+            limit = min(requested, limit)
+        return max(1, min(limit, total))
+
+    async def _run_item(self, index: int, request: ChatRequest) -> BatchChatResult:
+        """
+        Run a single chat request, capturing any failure on the result.
+
+        Args:
+            index: Position of the request in the batch
+            request: The chat request
+
+        Returns:
+            BatchChatResult: The full reply or the error for this item
+        """
+        try:
+            transcript = TranscriptBuilder()
+            pipeline = create_reply_pipeline(transcript)
+            async for _ in pipeline.run(self.chat_service.process_message(
+                request.message,
+                conversation_id=request.conversation_id,
+                raise_errors=True
+            )):
+                pass
+
+            return BatchChatResult(
+                index=index,
+                message=transcript.text,
+                conversation_id=request.conversation_id
+            )
+
+        except Exception as e:
+            return BatchChatResult(
+                index=index,
+                conversation_id=request.conversation_id,
+                error=str(e)
+            )
+
+    async def stream_batch(
+        self,
+        requests: list[ChatRequest],
+        max_concurrency: Optional[int] = None
+    ) -> AsyncGenerator[BatchChatResult, None]:
+        """
+        Process a batch and yield each result as soon as it completes.
+
+        A fixed pool of workers pulls requests from a shared queue, so the
+        number of tasks stays bounded regardless of batch size.
+
+        Args:
+            requests: The chat requests to process
+            max_concurrency: Optional per-batch concurrency limit
+
+        Yields:
+            BatchChatResult: Results in completion order
+        """
+        if not requests:
+            return
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(requests):
+            pending.put_nowait(item)
+
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    index, request = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await results.put(await self._run_item(index, request))
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(self._resolve_concurrency(max_concurrency, len(requests)))
+        ]
+
+        try:
+            for _ in range(len(requests)):
+                yield await results.get()
+        finally:
+            # Stop outstanding work if the consumer goes away early
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def process_batch(
+        self,
+        requests: list[ChatRequest],
+        max_concurrency: Optional[int] = None
+    ) -> list[BatchChatResult]:
+        """
+        Process a batch and return the results in request order.
+
+        Args:
+            requests: The chat requests to process
+            max_concurrency: Optional per-batch concurrency limit
+
+        Returns:
+            list[BatchChatResult]: One result per request, ordered by index
+        """
+        results: list[Optional[BatchChatResult]] = [None] * len(requests)
+        async for result in self.stream_batch(requests, max_concurrency):
+            results[result.index] = result
+        return results
+
+# Global instance
+batch_service = BatchChatService(chatgpt_service)
@@ -4,22 +4,58 @@ from typing import AsyncGenerator, Optional
 from openai import AsyncOpenAI
 from config import settings
 from models import ChatMessage, MessageRole
+from services.prompt_cache import PromptCache
+from services.usage_tracker import (
+    UsageTracker,
+    usage_tracker,
+    estimate_tokens,
+    estimate_message_tokens
+)
+
+def _extract_usage(chunk) -> Optional[tuple[int, int]]:
+    """Get (prompt_tokens, completion_tokens) from a stream chunk that reports usage."""
+    usage = getattr(chunk, "usage", None)
+    if isinstance(usage, dict):
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+    
+    if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+        return prompt_tokens, completion_tokens
+    return None
 
 class ChatGPTService:
     """Service for interacting with OpenAI ChatGPT API."""
     
-    def __init__(self):
-        """Initialize the ChatGPT service."""
+    def __init__(
+        self,
+        prompt_cache: Optional[PromptCache] = None,
+        usage_tracker: Optional[UsageTracker] = None
+    ):
+        """
+        Initialize the ChatGPT service.
+        
+        Args:
+            prompt_cache: Optional near-duplicate cache for first-turn prompts
+            usage_tracker: Tracker for token usage and budgets
+        """
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is not set in environment variables")
         
         self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.OPENAI_MODEL
+        self.prompt_cache = prompt_cache
+        self.usage_tracker = usage_tracker or UsageTracker()
     
     async def process_message(
         self, 
         user_message: str, 
-        conversation_history: Optional[list[ChatMessage]] = None
+        conversation_history: Optional[list[ChatMessage]] = None,
+        conversation_id: Optional[str] = None,
+        connection_id: Optional[str] = None,
+        raise_errors: bool = False
     ) -> AsyncGenerator[str, None]:
         """
         Process a user message and stream the response from ChatGPT.
@@ -27,50 +63,107 @@ class ChatGPTService:
         Args:
             user_message: The user's input message
             conversation_history: Previous messages in the conversation
+            conversation_id: Optional conversation to account usage to
+            connection_id: Optional connection to account usage to
+            raise_errors: Re-raise upstream errors instead of yielding them as text
             
         Yields:
             str: Chunks of the response as they are received
-        """
-        try:
-            # Prepare messages for the API
-            messages = []
-            
-            # Add system message if no history
-            if not conversation_history:
-                messages.append({
-                    "role": "system",
-                    "content": "You are a helpful AI assistant. Provide clear, concise, and helpful responses."
-                })
-            else:
-                # Add conversation history
-                for msg in conversation_history:
-                    messages.append({
-                        "role": msg.role.value,
-                        "content": msg.content
-                    })
             
-            # Add the current user message
+        Raises:
+            BudgetExceededError: If the request is over a token budget; raised
+                before the upstream call
+        """
+        # Only first-turn prompts are cached; replies to a history depend on it
+        use_cache = self.prompt_cache is not None and not conversation_history
+        if use_cache:
+            cached_reply = self.prompt_cache.get(user_message)
+            if cached_reply is not None:
+                yield cached_reply
+                return
+        
+        # Prepare messages for the API
+        messages = []
+        
+        # Add system message if no history
+        if not conversation_history:
             messages.append({
-                "role": "user",
-                "content": user_message
+                "role": "system",
+                "content": "You are a helpful AI assistant. Provide clear, concise, and helpful responses."
             })
-            
+        else:
+            # Add conversation history
+            for msg in conversation_history:
+                messages.append({
+                    "role": msg.role.value,
+                    "content": msg.content
+                })
+        
+        # Add the current user message
+        messages.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        # Check budgets and size max_tokens before calling upstream
+        prompt_estimate = estimate_message_tokens(messages)
+        reservation = self.usage_tracker.reserve(prompt_estimate, conversation_id, connection_id)
+        
+        started = False
+        usage = None
+        finish_reason = None
+        reply_chunks = []
+        try:
             # Stream the response from ChatGPT
             stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 stream=True,
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=reservation.max_tokens,
+                extra_body={"stream_options": {"include_usage": True}}
             )
+            started = True
             
             async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+                usage = _extract_usage(chunk) or usage
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if isinstance(choice.finish_reason, str):
+                    finish_reason = choice.finish_reason
+                if choice.delta.content is not None:
+                    reply_chunks.append(choice.delta.content)
+                    yield choice.delta.content
+            
+            # Cache only complete replies; a reply cut short by a budget-reduced
+            # max_tokens must not be served to other conversations
+            if (
+                use_cache
+                and finish_reason == "stop"
+                and reservation.max_tokens >= self.usage_tracker.max_tokens_per_request
+            ):
+                self.prompt_cache.put(user_message, "".join(reply_chunks))
                     
         except Exception as e:
+            if raise_errors:
+                raise
             error_message = f"Error processing message: {str(e)}"
             yield error_message
+        
+        finally:
+            # Record reported usage, or estimate it if the stream didn't report any
+            if usage:
+                self.usage_tracker.record(reservation, *usage)
+            elif started:
+                self.usage_tracker.record(
+                    reservation,
+                    prompt_estimate,
+                    estimate_tokens("".join(reply_chunks)),
+                    estimated=True
+                )
+            else:
+                self.usage_tracker.record(reservation, 0, 0)
     
     async def validate_api_key(self) -> bool:
         """
@@ -91,4 +184,7 @@ class ChatGPTService:
             return False
 
 # Global instance
-chatgpt_service = ChatGPTService() 
\ No newline at end of file
+chatgpt_service = ChatGPTService(
+    prompt_cache=PromptCache() if settings.PROMPT_CACHE_ENABLED else None,
+    usage_tracker=usage_tracker
+) 
\ No newline at end of file
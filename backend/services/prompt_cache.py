@@ -0,0 +1,358 @@
+import re
+from itertools import islice
+from array import array
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from zlib import crc32
+from config import settings
+
+# Words that carry no meaning for matching support questions
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "please", "pls", "plz", "hi", "hello", "hey", "thanks",
+    "thank", "you", "thx", "um", "uh", "so", "just", "kindly", "could", "can",
+    "would", "ok", "okay"
+})
+
+_HASH_MASK = (1 << 64) - 1
+_EMPTY = _HASH_MASK
+_DENSIFY_OFFSET = 0x9E3779B97F4A7C15
+_DIGITS = re.compile(r"\d")
+
+def _stable_hash(text: str) -> int:
+    """Hash text stably across processes, unlike the salted hash(), spread over 64 bits."""
+    return (crc32(text.encode()) * _DENSIFY_OFFSET) & _HASH_MASK
+
+def _within_one_edit(first: str, second: str) -> bool:
+    """Whether two words differ by at most one insertion, deletion, substitution or transposition."""
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+
+    start = 0
+    while start < len(first) and first[start] == second[start]:
+        start += 1
+    if len(first) == len(second):
+        # One substitution, or two adjacent characters swapped
+        if first[start + 1:] == second[start + 1:]:
+            return True
+        return (
+            first[start + 2:] == second[start + 2:]
+            and first[start:start + 2] == second[start:start + 2][::-1]
+        )
+    return first[start:] == second[start + 1:]
+
+class CacheEntry:
+    """A cached reply with its MinHash signature."""
+
+    __slots__ = ("entry_id", "normalized", "signature", "reply")
+
+    def __init__(self, entry_id: int, normalized: str, signature: array, reply: str):
+        self.entry_id = entry_id
+        self.normalized = normalized
+        self.signature = signature
+        self.reply = reply
+
+class PromptCache:
+    """
+    Near-duplicate prompt cache backed by a MinHash/LSH index.
+
+    Prompts are normalized, split into character shingles and summarized by a
+    MinHash signature. Signatures are split into bands; prompts sharing any
+    band become candidates, and a candidate is a hit when the Jaccard
+    similarity estimated from the signatures reaches the threshold and the
+    two prompts differ only by typos in non-numeric words. Entries
+    are evicted least-recently-used once the cache is full. The number of
+    candidates compared per lookup is capped so crowded buckets cannot make
+    lookups slow: candidates are ranked by the number of bands they share
+    with the prompt, only the newest entries of an overfull bucket are
+    counted, and everything skipped is reported as truncated.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        threshold: float = None,
+        num_perm: int = None,
+        bands: int = None,
+        shingle_size: int = None,
+        max_candidates: int = None,
+        max_bucket_scan: int = None,
+        min_chars: int = None,
+        max_chars: int = None
+    ):
+        """
+        Initialize the prompt cache.
+
+        Args:
+            max_entries: Maximum number of cached replies
+            threshold: Minimum estimated Jaccard similarity for a hit
+            num_perm: Number of MinHash signature values
+            bands: Number of LSH bands; must divide num_perm
+            shingle_size: Character shingle length
+            max_candidates: Maximum LSH candidates compared per lookup
+            max_bucket_scan: Maximum entries counted from a single LSH bucket
+            min_chars: Shortest normalized prompt that is cached
+            max_chars: Longest normalized prompt that is cached, bounding lookup cost
+        """
+        self.max_entries = max_entries or settings.PROMPT_CACHE_MAX_ENTRIES
+        self.threshold = threshold if threshold is not None else settings.PROMPT_CACHE_THRESHOLD
+        self.num_perm = num_perm or settings.PROMPT_CACHE_NUM_PERM
+        self.bands = bands or settings.PROMPT_CACHE_BANDS
+        self.shingle_size = shingle_size or settings.PROMPT_CACHE_SHINGLE_SIZE
+        self.max_candidates = max_candidates or settings.PROMPT_CACHE_MAX_CANDIDATES
+        self.max_bucket_scan = max_bucket_scan or settings.PROMPT_CACHE_MAX_BUCKET_SCAN
+        self.min_chars = min_chars if min_chars is not None else settings.PROMPT_CACHE_MIN_CHARS
+        self.max_chars = max_chars or settings.PROMPT_CACHE_MAX_CHARS
+
+        if self.num_perm % self.bands:
+            raise ValueError("PROMPT_CACHE_NUM_PERM must be a multiple of PROMPT_CACHE_BANDS")
+        self.rows = self.num_perm // self.bands
+
+        self.entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self.exact_index: Dict[str, int] = {}
+        # Buckets are dicts so evicted entries are removed in constant time
+        self.band_index: Dict[bytes, Dict[int, None]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.candidates_checked = 0
+        self.candidates_rejected = 0
+        self.candidates_truncated = 0
+        self.word_mismatches = 0
+        self.hit_similarity_total = 0.0
+
+    def normalize(self, prompt: str) -> str:
+        """
+        Normalize casing, punctuation, whitespace and filler words.
+
+        Args:
+            prompt: The raw prompt
+
+        Returns:
+            str: The normalized prompt
+        """
+        words = re.findall(r"\w+", prompt.casefold())
+        meaningful = [word for word in words if word not in FILLER_WORDS]
+        return " ".join(meaningful or words)
+
+    def _cacheable(self, normalized: str) -> bool:
+        """Whether a normalized prompt can be matched safely and cheaply."""
+        return self.min_chars <= len(normalized) <= self.max_chars
+
+    def signature(self, normalized: str) -> array:
+        """
+        Compute the MinHash signature of a normalized prompt.
+
+        Uses one-permutation hashing: each shingle is hashed once and the hash
+        range is split into num_perm bins, keeping the minimum per bin. Empty
+        bins borrow the value of the next non-empty bin (rotation
+        densification), so the cost is linear in shingles plus num_perm
+        rather than their product.
+
+        Args:
+            normalized: The normalized prompt
+
+        Returns:
+            array: One unsigned 64-bit value per bin
+        """
+        size = self.shingle_size
+        if len(normalized) <= size:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+        num_perm = self.num_perm
+        bins = [_EMPTY] * num_perm
+        for shingle in shingles:
+            value, index = divmod(_stable_hash(shingle), num_perm)
+            if value < bins[index]:
+                bins[index] = value
+
+        # Densify: fill empty bins from the next non-empty bin to the right
+        last_value, distance = _EMPTY, 0
+        for index in range(2 * num_perm - 1, -1, -1):
+            value = bins[index % num_perm]
+            if value != _EMPTY:
+                last_value, distance = value, 0
+            else:
+                distance += 1
+                if index < num_perm and last_value != _EMPTY:
+                    bins[index] = (last_value + distance * _DENSIFY_OFFSET) & _HASH_MASK
+        return array("Q", bins)
+
+    def _band_keys(self, signature: array) -> List[bytes]:
+        """Split a signature into one LSH bucket key per band."""
+        rows = self.rows
+        return [
+            bytes((band,)) + signature[band * rows:(band + 1) * rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def _similarity(self, first: array, second: array) -> float:
+        """Estimate Jaccard similarity as the fraction of equal minimums."""
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    def get(self, prompt: str) -> Optional[str]:
+        """
+        Look up a cached reply for a prompt or a near-duplicate of it.
+
+        Args:
+            prompt: The raw prompt
+
+        Returns:
+            Optional[str]: The cached reply, or None on a miss
+        """
+        normalized = self.normalize(prompt)
+        if not self._cacheable(normalized):
+            self.skipped += 1
+            return None
+
+        entry_id = self.exact_index.get(normalized)
+        if entry_id is not None:
+            self.exact_hits += 1
+            return self._hit(entry_id, 1.0)
+
+        signature = self.signature(normalized)
+
+        # Entries colliding in more bands are likelier to be similar, so when
+        # there are too many candidates the most-colliding ones are compared
+        collisions: Counter = Counter()
+        for key in self._band_keys(signature):
+            bucket = self.band_index.get(key)
+            if not bucket:
+                continue
+            if len(bucket) > self.max_bucket_scan:
+                # Crowded buckets carry little signal; count only their newest entries
+                self.candidates_truncated += len(bucket) - self.max_bucket_scan
+                collisions.update(islice(reversed(bucket), self.max_bucket_scan))
+            else:
+                collisions.update(bucket.keys())
+        if len(collisions) > self.max_candidates:
+            self.candidates_truncated += len(collisions) - self.max_candidates
+            candidates = [entry_id for entry_id, _ in collisions.most_common(self.max_candidates)]
+        else:
+            candidates = list(collisions)
+
+        matches = []
+        for candidate_id in candidates:
+            similarity = self._similarity(signature, self.entries[candidate_id].signature)
+            if similarity >= self.threshold:
+                matches.append((similarity, candidate_id))
+
+        self.candidates_checked += len(candidates)
+        for similarity, candidate_id in sorted(matches, reverse=True):
+            if self._words_match(normalized, self.entries[candidate_id].normalized):
+                self.candidates_rejected += len(candidates) - 1
+                return self._hit(candidate_id, similarity)
+            self.word_mismatches += 1
+
+        self.candidates_rejected += len(candidates)
+        self.misses += 1
+        return None
+
+    def _words_match(self, first: str, second: str) -> bool:
+        """
+        Check that two normalized prompts differ only by typos.
+
+        Words found in only one prompt must pair up with a word in the other
+        that is within one edit, and words containing digits must be equal.
+        Character shingles alone rate e.g. "enable"/"disable" or order
+        12345/12346 as near-duplicates.
+
+        Args:
+            first: A normalized prompt
+            second: Another normalized prompt
+
+        Returns:
+            bool: True if the prompts may share a reply
+        """
+        first_words, second_words = Counter(first.split()), Counter(second.split())
+        only_first = list((first_words - second_words).elements())
+        only_second = list((second_words - first_words).elements())
+        if len(only_first) != len(only_second):
+            return False
+
+        for word in only_first:
+            for index, other in enumerate(only_second):
+                if not _DIGITS.search(word + other) and _within_one_edit(word, other):
+                    del only_second[index]
+                    break
+            else:
+                return False
+        return True
+
+    def _hit(self, entry_id: int, similarity: float) -> str:
+        """Record a hit and mark the entry as recently used."""
+        self.hits += 1
+        self.hit_similarity_total += similarity
+        self.entries.move_to_end(entry_id)
+        return self.entries[entry_id].reply
+
+    def put(self, prompt: str, reply: str):
+        """
+        Cache a reply for a prompt, evicting the least recently used entry if full.
+
+        Args:
+            prompt: The raw prompt
+            reply: The complete reply
+        """
+        normalized = self.normalize(prompt)
+        if not self._cacheable(normalized) or normalized in self.exact_index:
+            return
+
+        signature = self.signature(normalized)
+        entry = CacheEntry(self._next_id, normalized, signature, reply)
+        self._next_id += 1
+
+        self.entries[entry.entry_id] = entry
+        self.exact_index[normalized] = entry.entry_id
+        for key in self._band_keys(signature):
+            self.band_index.setdefault(key, {})[entry.entry_id] = None
+        self.stores += 1
+
+        while len(self.entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entry from all indexes."""
+        entry_id, entry = self.entries.popitem(last=False)
+        del self.exact_index[entry.normalized]
+        for key in self._band_keys(entry.signature):
+            bucket = self.band_index[key]
+            del bucket[entry_id]
+            if not bucket:
+                del self.band_index[key]
+        self.evictions += 1
+
+    def get_stats(self) -> dict:
+        """
+        Get cache size and hit-quality counters.
+
+        Returns:
+            dict: Counters describing cache effectiveness
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "lookups": lookups,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "near_duplicate_hits": self.hits - self.exact_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "average_hit_similarity": self.hit_similarity_total / self.hits if self.hits else 0.0,
+            "candidates_checked": self.candidates_checked,
+            "candidates_rejected": self.candidates_rejected,
+            "candidates_truncated": self.candidates_truncated,
+            "word_mismatches": self.word_mismatches,
+            "stores": self.stores,
+            "evictions": self.evictions
+        }
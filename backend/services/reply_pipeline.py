@@ -0,0 +1,289 @@
+import re
+from typing import AsyncGenerator, AsyncIterator, List
+from config import settings
+
+# Built-in redaction patterns, selectable by name through REPLY_REDACT
+REDACTION_PATTERNS = {
+    "email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
+    "api_key": r"\bsk-[A-Za-z0-9_-]{16,64}",
+    "credit_card": r"\b(?:\d[ -]?){13,16}\b"
+}
+
+class PipelineStage:
+    """
+    Base class for an incremental reply stage.
+
+    feed() receives each delta and returns the text to pass downstream, which
+    may be empty while the stage holds text back. flush() returns whatever is
+    still held once the upstream ends. Stages must do work proportional to
+    the delta, never to the whole reply.
+    """
+
+    # Set by a stage to stop the upstream generation
+    done: bool = False
+
+    def feed(self, text: str) -> str:
+        """Process a delta and return the text to emit."""
+        return text
+
+    def flush(self) -> str:
+        """Return any text held back by the stage."""
+        return ""
+
+class TranscriptBuilder(PipelineStage):
+    """Records emitted text so the full reply can be assembled in linear time."""
+
+    def __init__(self):
+        """Initialize the transcript."""
+        self.parts: List[str] = []
+
+    def feed(self, text: str) -> str:
+        """Record a delta and pass it through."""
+        self.parts.append(text)
+        return text
+
+    @property
+    def text(self) -> str:
+        """The full transcript so far."""
+        if len(self.parts) > 1:
+            self.parts = ["".join(self.parts)]
+        return self.parts[0] if self.parts else ""
+
+class BoundaryChunker(PipelineStage):
+    """
+    Re-chunks a reply on sentence or markdown block boundaries.
+
+    In "sentence" mode text is released after sentence-ending punctuation
+    followed by whitespace, or after a newline. In "markdown" mode text is
+    released at blank lines outside fenced code blocks, so a renderer never
+    receives half a paragraph, list or code block. Held text is released
+    regardless once it exceeds max_buffer characters.
+    """
+
+    SENTENCE_BOUNDARY = re.compile(r"[.!?][\"')\]]?\s+|\n")
+    MARKDOWN_TOKEN = re.compile(r"```|\n\n")
+    LOOKBEHIND = 2  # Longest boundary token minus one
+
+    def __init__(self, mode: str = "sentence", max_buffer: int = None):
+        """
+        Initialize the chunker.
+
+        Args:
+            mode: "sentence" or "markdown"
+            max_buffer: Maximum characters held before a forced release
+        """
+        if mode not in ("sentence", "markdown"):
+            raise ValueError(f"Unknown chunking mode: {mode}")
+        self.mode = mode
+        self.max_buffer = max_buffer or settings.REPLY_CHUNK_MAX_BUFFER
+        self.parts: List[str] = []
+        self.length = 0
+        self.tail = ""
+        self.in_fence = False
+
+    def feed(self, text: str) -> str:
+        """Hold text until a boundary is seen and release everything before it."""
+        if not text:
+            return ""
+
+        # Only the new text plus a short lookbehind is scanned
+        scan = self.tail + text
+        base = self.length - len(self.tail)
+        self.parts.append(text)
+        self.length += len(text)
+        self.tail = scan[-self.LOOKBEHIND:]
+
+        boundary = None
+        if self.mode == "sentence":
+            for match in self.SENTENCE_BOUNDARY.finditer(scan):
+                boundary = match.end()
+        else:
+            for match in self.MARKDOWN_TOKEN.finditer(scan):
+                if match.group() == "```":
+                    self.in_fence = not self.in_fence
+                elif not self.in_fence:
+                    boundary = match.end()
+
+        if boundary is not None:
+            return self._release(base + boundary)
+        if self.length >= self.max_buffer:
+            return self._release(self.length)
+        return ""
+
+    def _release(self, position: int) -> str:
+        """Emit held text up to position and keep the remainder."""
+        held = "".join(self.parts)
+        released, remainder = held[:position], held[position:]
+        self.parts = [remainder] if remainder else []
+        self.length = len(remainder)
+        self.tail = remainder[-self.LOOKBEHIND:]
+        return released
+
+    def flush(self) -> str:
+        """Release everything still held."""
+        return self._release(self.length)
+
+class RedactionFilter(PipelineStage):
+    """
+    Replaces matches of sensitive patterns as the reply streams.
+
+    The last `window` characters are held back so a match that spans deltas
+    is still caught; patterns must therefore match at most `window`
+    characters. The held text starts after whitespace unless a token is longer
+    than the window, so word boundaries are seen as when redacting the whole
+    reply.
+    """
+
+    def __init__(self, patterns: List[str], replacement: str = "[REDACTED]", window: int = None):
+        """
+        Initialize the filter.
+
+        Args:
+            patterns: Regular expressions to redact
+            replacement: Text substituted for each match
+            window: Characters held back to catch matches spanning deltas
+        """
+        self.pattern = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+        self.replacement = replacement
+        self.window = window or settings.REPLY_REDACT_WINDOW
+        self.held = ""
+
+    def feed(self, text: str) -> str:
+        """Redact complete matches and hold back text that may start one."""
+        text = self.held + text
+        cut = self._token_start(text, max(0, len(text) - self.window))
+
+        # Redact matches found in the full text; matching only the released
+        # prefix would treat its end as a word boundary. Never split text
+        # that may be part of a match still being streamed.
+        parts = []
+        position = 0
+        for match in self.pattern.finditer(text):
+            if match.end() > cut:
+                cut = min(cut, match.start())
+                break
+            parts.append(text[position:match.start()])
+            parts.append(self.replacement)
+            position = match.end()
+        parts.append(text[position:cut])
+
+        self.held = text[cut:]
+        return "".join(parts)
+
+    def _token_start(self, text: str, cut: int) -> int:
+        """Move cut back to just after whitespace so it never splits a token."""
+        for index in range(cut, max(0, cut - self.window), -1):
+            if text[index - 1].isspace():
+                return index
+        # The held text already starts on a boundary; otherwise a token longer
+        # than the window is split, keeping the held text bounded
+        return 0 if cut <= self.window else cut
+
+    def flush(self) -> str:
+        """Redact and release the held text."""
+        text, self.held = self.held, ""
+        return self.pattern.sub(self.replacement, text)
+
+class MaxLengthCutoff(PipelineStage):
+    """Truncates the reply at max_chars and stops the upstream generation."""
+
+    def __init__(self, max_chars: int):
+        """
+        Initialize the cutoff.
+
+        Args:
+            max_chars: Maximum characters emitted
+        """
+        self.max_chars = max_chars
+        self.emitted = 0
+
+    def feed(self, text: str) -> str:
+        """Pass text through until the limit is reached."""
+        if self.done:
+            return ""
+
+        remaining = self.max_chars - self.emitted
+        if len(text) >= remaining:
+            self.done = True
+            text = text[:remaining]
+        self.emitted += len(text)
+        return text
+
+class StreamPipeline:
+    """Runs reply deltas through a sequence of incremental stages."""
+
+    def __init__(self, stages: List[PipelineStage]):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages applied in order
+        """
+        self.stages = stages
+
+    def _push(self, text: str, start: int = 0) -> str:
+        """Feed text through the stages from index start onwards."""
+        for stage in self.stages[start:]:
+            if not text:
+                break
+            text = stage.feed(text)
+        return text
+
+    async def run(self, upstream: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """
+        Transform an upstream reply as it streams.
+
+        Args:
+            upstream: Async iterator of reply deltas
+
+        Yields:
+            str: Processed deltas; empty outputs are skipped
+        """
+        try:
+            async for delta in upstream:
+                output = self._push(delta)
+                if output:
+                    yield output
+                if any(stage.done for stage in self.stages):
+                    break
+        finally:
+            # Stop the upstream generation if a stage cut the reply short
+            aclose = getattr(upstream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        # Release held text, passing each stage's remainder through the rest
+        for index, stage in enumerate(self.stages):
+            output = self._push(stage.flush(), index + 1)
+            if output:
+                yield output
+
+def create_reply_pipeline(*extra_stages: PipelineStage) -> StreamPipeline:
+    """
+    Build the reply pipeline configured in settings.
+
+    Redaction runs first so that later stages never see sensitive text,
+    followed by the length cutoff, boundary chunking and any extra stages.
+    The cutoff therefore counts redacted characters, and because redaction
+    holds back up to REPLY_REDACT_WINDOW characters, the upstream may generate
+    that much past REPLY_MAX_CHARS before it is stopped. Cutting before
+    redaction instead could split a match and leak the part left unredacted.
+
+    Args:
+        extra_stages: Stages appended after the configured ones, e.g. a TranscriptBuilder
+
+    Returns:
+        StreamPipeline: A new pipeline for a single reply
+    """
+    stages: List[PipelineStage] = []
+
+    redact = [name.strip() for name in settings.REPLY_REDACT.split(",") if name.strip()]
+    if redact:
+        stages.append(RedactionFilter([REDACTION_PATTERNS[name] for name in redact]))
+    if settings.REPLY_MAX_CHARS:
+        stages.append(MaxLengthCutoff(settings.REPLY_MAX_CHARS))
+    if settings.REPLY_CHUNKING != "none":
+        stages.append(BoundaryChunker(settings.REPLY_CHUNKING))
+
+    stages.extend(extra_stages)
+    return StreamPipeline(stages)
@@ -0,0 +1,256 @@
+import heapq
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from config import settings
+
+# Rough per-message overhead of the chat format, in tokens
+MESSAGE_TOKEN_OVERHEAD = 4
+
+class BudgetExceededError(Exception):
+    """Raised when a request would exceed a token budget."""
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text locally, at about four characters per token.
+
+    Args:
+        text: The text to estimate
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    return (len(text) + 3) // 4
+
+def estimate_message_tokens(messages: Iterable[dict]) -> int:
+    """
+    Estimate the prompt tokens of chat messages.
+
+    Args:
+        messages: Messages in the chat completions format
+
+    Returns:
+        int: Estimated number of prompt tokens
+    """
+    return sum(
+        estimate_tokens(message["content"]) + MESSAGE_TOKEN_OVERHEAD
+        for message in messages
+    )
+
+class UsageTotals:
+    """Token counters for a single scope (conversation, connection or global)."""
+
+    __slots__ = ("prompt_tokens", "completion_tokens", "requests", "estimated_requests", "reserved")
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+        self.estimated_requests = 0
+        self.reserved = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt plus completion tokens."""
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        """Get the counters as a dict."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "requests": self.requests,
+            "estimated_requests": self.estimated_requests
+        }
+
+class Reservation:
+    """Tokens held against budgets for a request until its usage is recorded."""
+
+    __slots__ = ("tokens", "max_tokens", "scopes")
+
+    def __init__(self, tokens: int, max_tokens: int, scopes: List[UsageTotals]):
+        self.tokens = tokens
+        self.max_tokens = max_tokens
+        self.scopes = scopes
+
+class UsageTracker:
+    """
+    Aggregates token usage per conversation, per connection and globally.
+
+    Before each upstream call a request reserves its estimated prompt tokens
+    plus max_tokens against every applicable budget, so concurrent requests
+    cannot overshoot a budget together. The reservation is replaced by the
+    actual usage once the call finishes.
+    """
+
+    def __init__(
+        self,
+        max_tokens_per_request: int = None,
+        conversation_budget: int = None,
+        connection_budget: int = None,
+        global_budget: int = None,
+        max_tracked: int = None
+    ):
+        """
+        Initialize the usage tracker.
+
+        Args:
+            max_tokens_per_request: Upper bound on max_tokens sent upstream
+            conversation_budget: Total tokens allowed per conversation; 0 disables
+            connection_budget: Total tokens allowed per connection; 0 disables
+            global_budget: Total tokens allowed for the process; 0 disables
+            max_tracked: Maximum conversations and connections kept, least recently used first out
+        """
+        self.max_tokens_per_request = max_tokens_per_request or settings.USAGE_MAX_TOKENS_PER_REQUEST
+        self.conversation_budget = (
+            conversation_budget if conversation_budget is not None
+            else settings.USAGE_CONVERSATION_TOKEN_BUDGET
+        )
+        self.connection_budget = (
+            connection_budget if connection_budget is not None
+            else settings.USAGE_CONNECTION_TOKEN_BUDGET
+        )
+        self.global_budget = (
+            global_budget if global_budget is not None
+            else settings.USAGE_GLOBAL_TOKEN_BUDGET
+        )
+        self.max_tracked = max_tracked or settings.USAGE_MAX_TRACKED
+
+        self.global_totals = UsageTotals()
+        self.conversations: "OrderedDict[str, UsageTotals]" = OrderedDict()
+        self.connections: "OrderedDict[str, UsageTotals]" = OrderedDict()
+        self.rejected_requests = 0
+        self.last_snapshot: Optional[dict] = None
+
+    def _scope(self, scopes: "OrderedDict[str, UsageTotals]", key: str) -> UsageTotals:
+        """Get or create the totals for a key, evicting the least recently used."""
+        totals = scopes.get(key)
+        if totals is None:
+            totals = scopes[key] = UsageTotals()
+            if len(scopes) > self.max_tracked:
+                scopes.popitem(last=False)
+        else:
+            scopes.move_to_end(key)
+        return totals
+
+    def reserve(
+        self,
+        prompt_tokens: int,
+        conversation_id: Optional[str] = None,
+        connection_id: Optional[str] = None
+    ) -> Reservation:
+        """
+        Reserve tokens for a request and choose its max_tokens.
+
+        Args:
+            prompt_tokens: Estimated prompt tokens of the request
+            conversation_id: Optional conversation the request belongs to
+            connection_id: Optional connection the request came from
+
+        Returns:
+            Reservation: The reservation, carrying the max_tokens to send upstream
+
+        Raises:
+            BudgetExceededError: If any budget cannot fit the prompt and a reply
+        """
+        budgets = [(self.global_totals, self.global_budget, "global")]
+        if conversation_id:
+            budgets.append((
+                self._scope(self.conversations, conversation_id),
+                self.conversation_budget,
+                "conversation"
+            ))
+        if connection_id:
+            budgets.append((
+                self._scope(self.connections, connection_id),
+                self.connection_budget,
+                "connection"
+            ))
+
+        max_tokens = self.max_tokens_per_request
+        for totals, budget, name in budgets:
+            if not budget:
+                continue
+            available = budget - totals.total_tokens - totals.reserved - prompt_tokens
+            if available < 1:
+                self.rejected_requests += 1
+                raise BudgetExceededError(f"Token budget exceeded for {name}")
+            max_tokens = min(max_tokens, available)
+
+        scopes = [totals for totals, _, _ in budgets]
+        reservation = Reservation(prompt_tokens + max_tokens, max_tokens, scopes)
+        for totals in scopes:
+            totals.reserved += reservation.tokens
+        return reservation
+
+    def record(
+        self,
+        reservation: Reservation,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool = False
+    ):
+        """
+        Replace a reservation with the actual usage of the request.
+
+        Args:
+            reservation: The reservation returned by reserve()
+            prompt_tokens: Prompt tokens consumed
+            completion_tokens: Completion tokens consumed
+            estimated: Whether the usage was estimated locally
+        """
+        for totals in reservation.scopes:
+            totals.reserved -= reservation.tokens
+            totals.prompt_tokens += prompt_tokens
+            totals.completion_tokens += completion_tokens
+            totals.requests += 1
+            if estimated:
+                totals.estimated_requests += 1
+
+    def get_usage(self, conversation_id: str = None, connection_id: str = None) -> dict:
+        """
+        Get the usage of a conversation, a connection or the whole process.
+
+        Args:
+            conversation_id: Optional conversation ID
+            connection_id: Optional connection ID
+
+        Returns:
+            dict: The usage counters
+        """
+        if conversation_id:
+            totals = self.conversations.get(conversation_id)
+        elif connection_id:
+            totals = self.connections.get(connection_id)
+        else:
+            totals = self.global_totals
+        return (totals or UsageTotals()).to_dict()
+
+    def take_snapshot(self, top: int = 10) -> dict:
+        """
+        Capture global usage and the heaviest conversations and connections.
+
+        Args:
+            top: Number of conversations and connections to include
+
+        Returns:
+            dict: The snapshot, also kept as last_snapshot
+        """
+        def heaviest(scopes: Dict[str, UsageTotals]) -> List[dict]:
+            items = heapq.nlargest(top, scopes.items(), key=lambda item: item[1].total_tokens)
+            return [{"id": key, **totals.to_dict()} for key, totals in items]
+
+        self.last_snapshot = {
+            "timestamp": time.time(),
+            "global": self.global_totals.to_dict(),
+            "rejected_requests": self.rejected_requests,
+            "tracked_conversations": len(self.conversations),
+            "tracked_connections": len(self.connections),
+            "top_conversations": heaviest(self.conversations),
+            "top_connections": heaviest(self.connections)
+        }
+        return self.last_snapshot
+
+# Global instance
+usage_tracker = UsageTracker()
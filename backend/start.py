@@ -18,5 +18,6 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=True,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
         log_level="info"
     ) 
\ No newline at end of file
@@ -0,0 +1,220 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from config import settings
+from models import WebSocketMessage
+from websocket_manager import websocket_manager
+
+class ReplayStream:
+    """A single in-flight reply with sequence-numbered chunks kept for replay."""
+
+    def __init__(
+        self,
+        stream_id: str,
+        connection_id: str,
+        conversation_id: Optional[str] = None,
+        max_chunks: int = 2000,
+        stream_index: int = 0
+    ):
+        """
+        Initialize the replay stream.
+
+        Args:
+            stream_id: Unique ID of the stream
+            connection_id: Connection currently receiving the stream
+            conversation_id: Optional conversation ID the reply belongs to
+            max_chunks: Maximum number of chunks retained for replay
+            stream_index: Numeric stream identifier for compact binary frames
+        """
+        self.stream_id = stream_id
+        self.stream_index = stream_index
+        self.connection_id = connection_id
+        self.conversation_id = conversation_id
+        self.chunks: Deque[WebSocketMessage] = deque(maxlen=max_chunks)
+        self.last_seq = 0
+        self.delivered_seq = 0
+        self.is_complete = False
+        self.completed_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def append(self, data: dict) -> WebSocketMessage:
+        """
+        Assign the next sequence number to a chunk and retain it.
+
+        Args:
+            data: The message payload
+
+        Returns:
+            WebSocketMessage: The sequenced message
+        """
+        self.last_seq += 1
+        message = WebSocketMessage(
+            type="message",
+            data={
+                **data,
+                "stream_id": self.stream_id,
+                "stream_index": self.stream_index,
+                "seq": self.last_seq
+            },
+            conversation_id=self.conversation_id
+        )
+        self.chunks.append(message)
+
+        if data.get("is_complete"):
+            self.is_complete = True
+            self.completed_at = time.monotonic()
+
+        return message
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest retained chunk."""
+        if not self.chunks:
+            return self.last_seq + 1
+        return self.chunks[0].data["seq"]
+
+    def chunks_after(self, seq: int) -> List[WebSocketMessage]:
+        """
+        Get retained chunks with a sequence number greater than seq.
+
+        Args:
+            seq: The last sequence number already delivered
+
+        Returns:
+            List[WebSocketMessage]: The chunks to deliver, in order
+        """
+        start = max(0, seq + 1 - self.first_seq)
+        return [self.chunks[i] for i in range(start, len(self.chunks))]
+
+class StreamManager:
+    """Keeps in-flight replies in bounded replay buffers so clients can resume."""
+
+    def __init__(self, connection_manager, max_chunks: int = None, grace_seconds: float = None):
+        """
+        Initialize the stream manager.
+
+        Args:
+            connection_manager: Manager used to deliver messages to connections
+            max_chunks: Maximum number of chunks retained per stream
+            grace_seconds: How long a completed stream stays resumable
+        """
+        self.connection_manager = connection_manager
+        self.max_chunks = max_chunks or settings.STREAM_BUFFER_MAX_CHUNKS
+        self.grace_seconds = (
+            grace_seconds if grace_seconds is not None else settings.STREAM_RESUME_GRACE_SECONDS
+        )
+        self.streams: Dict[str, ReplayStream] = {}
+        self._next_index = 0
+
+    def create_stream(self, connection_id: str, conversation_id: str = None) -> ReplayStream:
+        """
+        Register a new stream for a reply.
+
+        Args:
+            connection_id: The connection that requested the reply
+            conversation_id: Optional conversation ID
+
+        Returns:
+            ReplayStream: The new stream
+        """
+        self.purge_expired()
+
+        # Process-wide, so the index stays valid when a stream is resumed elsewhere
+        self._next_index = (self._next_index + 1) & 0xFFFFFFFF
+        stream = ReplayStream(
+            str(uuid.uuid4()),
+            connection_id,
+            conversation_id,
+            self.max_chunks,
+            self._next_index
+        )
+        self.streams[stream.stream_id] = stream
+        return stream
+
+    def get_stream(self, stream_id: str) -> Optional[ReplayStream]:
+        """
+        Look up a stream that is still resumable.
+
+        Args:
+            stream_id: The stream ID
+
+        Returns:
+            Optional[ReplayStream]: The stream, or None if unknown or expired
+        """
+        self.purge_expired()
+        return self.streams.get(stream_id)
+
+    async def publish(self, stream: ReplayStream, data: dict):
+        """
+        Append a chunk to a stream and deliver it to the attached connection.
+
+        Args:
+            stream: The stream
+            data: The message payload
+        """
+        stream.append(data)
+        await self._flush(stream)
+
+    async def resume(self, stream_id: str, connection_id: str, last_seq: int) -> bool:
+        """
+        Attach a connection to a stream and replay chunks after last_seq.
+
+        Args:
+            stream_id: The stream to resume
+            connection_id: The connection taking over the stream
+            last_seq: Last sequence number the client received
+
+        Returns:
+            bool: False if the stream is gone or the missed chunks were evicted
+        """
+        stream = self.get_stream(stream_id)
+        if stream is None or last_seq + 1 < stream.first_seq:
+            return False
+
+        async with stream.lock:
+            stream.connection_id = connection_id
+            stream.delivered_seq = min(last_seq, stream.last_seq)
+
+        await self._flush(stream)
+        return True
+
+    async def _flush(self, stream: ReplayStream):
+        """
+        Deliver undelivered chunks to the attached connection, in order.
+
+        Holding the stream lock keeps replayed chunks and the live tail from
+        interleaving when a client resumes mid-reply.
+        """
+        async with stream.lock:
+            for message in stream.chunks_after(stream.delivered_seq):
+                sent = await self.connection_manager.send_personal_message(
+                    stream.connection_id, message
+                )
+                if not sent:
+                    # Keep the rest buffered until a client resumes
+                    return
+                stream.delivered_seq = message.data["seq"]
+
+    def purge_expired(self):
+        """Drop completed streams whose grace period has elapsed."""
+        now = time.monotonic()
+        expired = [
+            stream_id for stream_id, stream in self.streams.items()
+            if stream.is_complete and now - stream.completed_at > self.grace_seconds
+        ]
+        for stream_id in expired:
+            del self.streams[stream_id]
+
+    def get_stream_count(self) -> int:
+        """
+        Get the number of resumable streams.
+
+        Returns:
+            int: Number of streams held in replay buffers
+        """
+        return len(self.streams)
+
+# Global stream manager instance
+stream_manager = StreamManager(websocket_manager)
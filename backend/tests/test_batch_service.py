@@ -0,0 +1,132 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+from services.batch_service import BatchChatService
+from services.chatgpt_service import ChatGPTService
+from models import ChatRequest
+
+class FakeChatService:
+    """Chat service double that tracks concurrent calls."""
+
+    def __init__(self, fail_on=None, delays=None):
+        self.fail_on = fail_on or set()
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process_message(
+        self,
+        user_message,
+        conversation_history=None,
+        conversation_id=None,
+        connection_id=None,
+        raise_errors=False
+    ):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(user_message, 0.01))
+            if user_message in self.fail_on:
+                if not raise_errors:
+                    yield f"Error processing message: failed: {user_message}"
+                    return
+                raise RuntimeError(f"failed: {user_message}")
+            yield "Reply to "
+            yield user_message
+        finally:
+            self.in_flight -= 1
+
+class TestBatchChatService:
+    """Test cases for BatchChatService."""
+
+    @pytest.mark.asyncio
+    async def test_process_batch_returns_results_in_order(self):
+        """Test that results follow request order regardless of completion order."""
+        fake = FakeChatService(delays={"a": 0.05, "b": 0.01, "c": 0.02})
+        service = BatchChatService(fake, max_concurrency=3)
+        requests = [
+            ChatRequest(message="a", conversation_id="conv-a"),
+            ChatRequest(message="b"),
+            ChatRequest(message="c")
+        ]
+
+        results = await service.process_batch(requests)
+
+        assert [r.index for r in results] == [0, 1, 2]
+        assert [r.message for r in results] == ["Reply to a", "Reply to b", "Reply to c"]
+        assert results[0].conversation_id == "conv-a"
+        assert all(r.error is None for r in results)
+
+    @pytest.mark.asyncio
+    async def test_process_batch_respects_concurrency_limit(self):
+        """Test that no more than the configured number of requests run at once."""
+        fake = FakeChatService()
+        service = BatchChatService(fake, max_concurrency=4)
+        requests = [ChatRequest(message=f"m{i}") for i in range(20)]
+
+        results = await service.process_batch(requests)
+
+        assert len(results) == 20
+        assert fake.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_request_concurrency_cannot_exceed_configured_limit(self):
+        """Test that a per-batch concurrency above the service limit is clamped."""
+        fake = FakeChatService()
+        service = BatchChatService(fake, max_concurrency=2)
+        requests = [ChatRequest(message=f"m{i}") for i in range(10)]
+
+        await service.process_batch(requests, max_concurrency=50)
+
+        assert fake.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_per_item_errors(self):
+        """Test that a failing item reports an error without failing the batch."""
+        fake = FakeChatService(fail_on={"bad"})
+        service = BatchChatService(fake, max_concurrency=2)
+        requests = [ChatRequest(message="good"), ChatRequest(message="bad")]
+
+        results = await service.process_batch(requests)
+
+        assert results[0].message == "Reply to good"
+        assert results[0].error is None
+        assert results[1].message is None
+        assert results[1].error == "failed: bad"
+
+    @pytest.mark.asyncio
+    async def test_per_item_errors_from_chat_service(self):
+        """Test that upstream failures in the real service surface as item errors."""
+        with patch('services.chatgpt_service.settings') as mock_settings, \
+             patch('services.chatgpt_service.AsyncOpenAI') as mock_openai:
+            mock_settings.OPENAI_API_KEY = "test_api_key"
+            mock_settings.OPENAI_MODEL = "gpt-3.5-turbo"
+            mock_client = AsyncMock()
+            mock_client.chat.completions.create.side_effect = Exception("429 rate limited")
+            mock_openai.return_value = mock_client
+            chat_service = ChatGPTService()
+
+        service = BatchChatService(chat_service, max_concurrency=2)
+        results = await service.process_batch([ChatRequest(message="Hello")])
+
+        assert results[0].message is None
+        assert results[0].error == "429 rate limited"
+        assert chat_service.usage_tracker.get_usage()["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_batch_yields_in_completion_order(self):
+        """Test that streaming yields results as they complete."""
+        fake = FakeChatService(delays={"slow": 0.05, "fast": 0.0})
+        service = BatchChatService(fake, max_concurrency=2)
+        requests = [ChatRequest(message="slow"), ChatRequest(message="fast")]
+
+        indices = [r.index async for r in service.stream_batch(requests)]
+
+        assert indices == [1, 0]
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self):
+        """Test that an empty batch produces no results."""
+        service = BatchChatService(FakeChatService(), max_concurrency=2)
+
+        assert await service.process_batch([]) == []
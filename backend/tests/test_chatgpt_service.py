@@ -2,6 +2,8 @@ import pytest
 import asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from services.chatgpt_service import ChatGPTService
+from services.prompt_cache import PromptCache
+from services.usage_tracker import UsageTracker, BudgetExceededError
 from models import ChatMessage, MessageRole
 
 class TestChatGPTService:
@@ -150,4 +152,127 @@ class TestChatGPTService:
         
         result = await service.validate_api_key()
         
-        assert result is False 
\ No newline at end of file
+        assert result is False
+    
+    @pytest.mark.asyncio
+    async def test_process_message_uses_prompt_cache(self, service, mock_openai_client):
+        """Test that a near-duplicate first-turn prompt is served from the cache."""
+        service.prompt_cache = PromptCache(max_entries=10)
+        
+        mock_chunk = MagicMock()
+        mock_chunk.choices = [MagicMock()]
+        mock_chunk.choices[0].delta.content = "Go to settings."
+        mock_chunk.choices[0].finish_reason = "stop"
+        
+        async def async_stream():
+            yield mock_chunk
+        
+        mock_openai_client.chat.completions.create.return_value = async_stream()
+        
+        first = [chunk async for chunk in service.process_message("How do I reset my password?")]
+        second = [chunk async for chunk in service.process_message("how do i reset my password")]
+        
+        assert first == ["Go to settings."]
+        assert second == ["Go to settings."]
+        mock_openai_client.chat.completions.create.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_process_message_does_not_cache_errors_or_history(self, service, mock_openai_client):
+        """Test that failed replies and prompts with history bypass the cache."""
+        service.prompt_cache = PromptCache(max_entries=10)
+        mock_openai_client.chat.completions.create.side_effect = Exception("API Error")
+        history = [ChatMessage(role=MessageRole.USER, content="Previous message")]
+        
+        [chunk async for chunk in service.process_message("Test message")]
+        [chunk async for chunk in service.process_message("Test message", history)]
+        
+        assert service.prompt_cache.get_stats()["stores"] == 0
+        assert service.prompt_cache.get_stats()["lookups"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_process_message_records_usage(self, service, mock_openai_client):
+        """Test that reported usage is recorded and estimated when missing."""
+        service.usage_tracker = UsageTracker(max_tokens_per_request=500, max_tracked=10)
+        
+        mock_chunk = MagicMock()
+        mock_chunk.choices = [MagicMock()]
+        mock_chunk.choices[0].delta.content = "Hello"
+        mock_chunk.usage = None
+        
+        usage_chunk = MagicMock()
+        usage_chunk.choices = []
+        usage_chunk.usage = {"prompt_tokens": 12, "completion_tokens": 3}
+        
+        async def async_stream():
+            yield mock_chunk
+            yield usage_chunk
+        
+        mock_openai_client.chat.completions.create.return_value = async_stream()
+        chunks = [chunk async for chunk in service.process_message("Hi", conversation_id="conv-1")]
+        
+        assert chunks == ["Hello"]
+        call_args = mock_openai_client.chat.completions.create.call_args
+        assert call_args[1]['max_tokens'] == 500
+        assert call_args[1]['extra_body'] == {"stream_options": {"include_usage": True}}
+        assert service.usage_tracker.get_usage(conversation_id="conv-1")["total_tokens"] == 15
+        
+        async def stream_without_usage():
+            yield mock_chunk
+        
+        mock_openai_client.chat.completions.create.return_value = stream_without_usage()
+        [chunk async for chunk in service.process_message("Hi", conversation_id="conv-1")]
+        
+        usage = service.usage_tracker.get_usage(conversation_id="conv-1")
+        assert usage["requests"] == 2
+        assert usage["estimated_requests"] == 1
+        assert usage["completion_tokens"] == 3 + 2
+    
+    @pytest.mark.asyncio
+    async def test_process_message_over_budget(self, service, mock_openai_client):
+        """Test that a request over budget is rejected before calling upstream."""
+        service.usage_tracker = UsageTracker(conversation_budget=10, max_tracked=10)
+        
+        with pytest.raises(BudgetExceededError):
+            [chunk async for chunk in service.process_message("x" * 100, conversation_id="conv-1")]
+        
+        mock_openai_client.chat.completions.create.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_truncated_reply_is_not_cached(self, service, mock_openai_client):
+        """Test that a reply cut short by a conversation's budget is not served to others."""
+        service.prompt_cache = PromptCache(max_entries=10)
+        service.usage_tracker = UsageTracker(
+            max_tokens_per_request=1000, conversation_budget=100, max_tracked=10
+        )
+        
+        truncated = MagicMock()
+        truncated.choices = [MagicMock()]
+        truncated.choices[0].delta.content = "To reset your"
+        truncated.choices[0].finish_reason = "length"
+        truncated.usage = None
+        
+        complete = MagicMock()
+        complete.choices = [MagicMock()]
+        complete.choices[0].delta.content = "To reset your password, open settings."
+        complete.choices[0].finish_reason = "stop"
+        complete.usage = None
+        
+        async def truncated_stream():
+            yield truncated
+        
+        async def complete_stream():
+            yield complete
+        
+        mock_openai_client.chat.completions.create.side_effect = [truncated_stream(), complete_stream()]
+        
+        first = [chunk async for chunk in service.process_message(
+            "How do I reset my password?", conversation_id="near-budget"
+        )]
+        second = [chunk async for chunk in service.process_message(
+            "how do I reset my password", conversation_id="fresh"
+        )]
+        
+        assert first == ["To reset your"]
+        assert mock_openai_client.chat.completions.create.call_args_list[0][1]['max_tokens'] < 1000
+        assert second == ["To reset your password, open settings."]
+        assert service.prompt_cache.get_stats()["stores"] == 0
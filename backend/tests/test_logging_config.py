@@ -0,0 +1,127 @@
+import io
+import json
+import logging
+import queue
+from unittest.mock import patch
+from logging_config import (
+    JsonFormatter,
+    RateLimitFilter,
+    NonBlockingQueueHandler,
+    BatchLogWriter,
+    get_logging_stats
+)
+
+def make_record(msg="Error sending message: %s", args=("boom",), level=logging.WARNING, **extra):
+    """Build a log record with optional context attributes."""
+    record = logging.LogRecord("chat.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+class TestJsonFormatter:
+    """Test cases for JsonFormatter."""
+
+    def test_formats_json_line_with_context(self):
+        """Test that records become JSON lines carrying connection context."""
+        record = make_record(connection_id="c1", conversation_id="conv-1")
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["level"] == "WARNING"
+        assert entry["logger"] == "chat.test"
+        assert entry["message"] == "Error sending message: boom"
+        assert entry["connection_id"] == "c1"
+        assert entry["conversation_id"] == "conv-1"
+        assert "stream_id" not in entry
+
+class TestRateLimitFilter:
+    """Test cases for RateLimitFilter."""
+
+    def test_suppresses_over_burst_and_reports_count(self):
+        """Test that repeats over the burst are dropped and later reported."""
+        rate_limit = RateLimitFilter(burst=2, interval=10)
+
+        with patch("logging_config.time.monotonic", return_value=100.0):
+            allowed = [rate_limit.filter(make_record(args=(i,))) for i in range(5)]
+
+        assert allowed == [True, True, False, False, False]
+
+        with patch("logging_config.time.monotonic", return_value=111.0):
+            record = make_record()
+            assert rate_limit.filter(record) is True
+
+        assert record.suppressed == 3
+        assert rate_limit.total_suppressed == 3
+
+    def test_total_counts_drops_never_reported_on_a_record(self):
+        """Test that drops are counted even if no later record of the key arrives."""
+        rate_limit = RateLimitFilter(burst=1, interval=10)
+
+        with patch("logging_config.time.monotonic", return_value=100.0):
+            for i in range(4):
+                rate_limit.filter(make_record(args=(i,)))
+
+        assert rate_limit.total_suppressed == 3
+
+    def test_keys_are_independent(self):
+        """Test that different message templates have separate budgets."""
+        rate_limit = RateLimitFilter(burst=1, interval=10)
+
+        assert rate_limit.filter(make_record("first %s")) is True
+        assert rate_limit.filter(make_record("second %s")) is True
+        assert rate_limit.filter(make_record("first %s")) is False
+
+    def test_info_records_are_not_limited(self):
+        """Test that lifecycle info from distinct connections is never suppressed."""
+        rate_limit = RateLimitFilter(burst=2, interval=10)
+
+        allowed = [
+            rate_limit.filter(make_record("Client connected", (), logging.INFO, connection_id=f"c{i}"))
+            for i in range(25)
+        ]
+
+        assert all(allowed)
+
+class TestNonBlockingQueueHandler:
+    """Test cases for NonBlockingQueueHandler."""
+
+    def test_drops_when_queue_full(self):
+        """Test that a full queue drops records instead of blocking."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+        handler.emit(make_record())
+        handler.emit(make_record())
+
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+    def test_stats_report_dropped_and_suppressed(self):
+        """Test that both loss counters are exposed for /health."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        rate_limit = RateLimitFilter(burst=1, interval=10)
+        handler.addFilter(rate_limit)
+
+        with patch("logging_config._handler", handler), patch("logging_config._rate_limit", rate_limit):
+            handler.handle(make_record("first %s"))
+            handler.handle(make_record("first %s"))
+            handler.handle(make_record("second %s"))
+
+            assert get_logging_stats() == {"dropped": 1, "suppressed": 1}
+
+class TestBatchLogWriter:
+    """Test cases for BatchLogWriter."""
+
+    def test_writes_queued_records_in_batches(self):
+        """Test that queued records are written as JSON lines and flushed on stop."""
+        log_queue = queue.Queue()
+        stream = io.StringIO()
+        for i in range(5):
+            log_queue.put(make_record(args=(i,), connection_id=f"c{i}"))
+
+        writer = BatchLogWriter(log_queue, stream, batch_size=2)
+        writer.start()
+        writer.stop()
+
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line)["connection_id"] for line in lines] == [f"c{i}" for i in range(5)]
+        assert not writer.is_alive()
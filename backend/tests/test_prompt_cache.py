@@ -0,0 +1,142 @@
+import pytest
+from services.prompt_cache import PromptCache
+
+class TestPromptCache:
+    """Test cases for PromptCache."""
+
+    @pytest.fixture
+    def cache(self):
+        """Create a small prompt cache."""
+        return PromptCache(max_entries=3, threshold=0.8, num_perm=64, bands=16, shingle_size=4)
+
+    def test_normalize(self, cache):
+        """Test that casing, punctuation and filler words are removed."""
+        assert cache.normalize("Hi! Can you PLEASE tell me, how do I reset my password?") == \
+            "tell me how do i reset my password"
+
+    def test_normalize_keeps_words_if_all_filler(self, cache):
+        """Test that a prompt made only of filler words is not emptied."""
+        assert cache.normalize("Hello, thank you!") == "hello thank you"
+
+    def test_exact_hit_after_normalization(self, cache):
+        """Test that prompts differing only in casing and punctuation hit."""
+        cache.put("How do I reset my password?", "Go to settings.")
+
+        assert cache.get("how do i reset my password") == "Go to settings."
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["exact_hits"] == 1
+
+    def test_near_duplicate_hit(self, cache):
+        """Test that a small variation is served from the cache."""
+        cache.put("How do I reset the password for my account?", "Go to settings.")
+
+        assert cache.get("how do I reset the password for my acount") == "Go to settings."
+        stats = cache.get_stats()
+        assert stats["near_duplicate_hits"] == 1
+        assert 0.8 <= stats["average_hit_similarity"] < 1.0
+
+    def test_different_prompt_misses(self, cache):
+        """Test that an unrelated prompt is not served from the cache."""
+        cache.put("How do I reset my password?", "Go to settings.")
+
+        assert cache.get("What are your opening hours on weekends?") is None
+        assert cache.get_stats()["misses"] == 1
+
+    @pytest.mark.parametrize("cached, prompt", [
+        (
+            "How do I enable two-factor authentication on my account?",
+            "How do I disable two-factor authentication on my account?"
+        ),
+        (
+            "Why was I charged twice for order 12345?",
+            "Why was I charged twice for order 12346?"
+        ),
+        (
+            "Can I cancel my subscription today?",
+            "Can I not cancel my subscription today?"
+        )
+    ])
+    def test_opposite_questions_miss(self, cache, cached, prompt):
+        """Test that prompts differing in a meaningful word or number are not served."""
+        cache.put(cached, "Cached answer")
+
+        assert cache.get(prompt) is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_words_match(self, cache):
+        """Test that only typos in non-numeric words are tolerated."""
+        assert cache._words_match("reset password for my acount", "reset password for my account")
+        assert cache._words_match("my password reset", "reset my password")
+        assert not cache._words_match("enable 2fa", "disable 2fa")
+        assert not cache._words_match("order 12345", "order 12346")
+        assert not cache._words_match("reset password", "reset password now")
+
+    def test_non_ascii_prompts_are_distinct(self, cache):
+        """Test that prompts in other scripts keep their words when normalized."""
+        cache.put("Как сбросить пароль?", "Reset answer")
+        cache.put("Reset 密码", "Password answer")
+
+        assert cache.normalize("Как сбросить пароль?") == "как сбросить пароль"
+        assert cache.get("как сбросить пароль") == "Reset answer"
+        assert cache.get("Как удалить аккаунт?") is None
+        assert cache.get("reset 账户") is None
+
+    def test_short_prompts_are_not_cached(self, cache):
+        """Test that prompts with too little text bypass the cache."""
+        cache.put("?!", "Empty answer")
+        cache.put("Hi, ok", "Short answer")
+
+        assert cache.get("...") is None
+        assert cache.get("hi ok") is None
+        stats = cache.get_stats()
+        assert stats["entries"] == 0
+        assert stats["skipped"] == 2
+        assert stats["lookups"] == 0
+
+    def test_old_near_duplicate_found_in_crowded_buckets(self):
+        """Test that candidates are ranked by shared bands rather than age."""
+        cache = PromptCache(
+            max_entries=1000, threshold=0.8, num_perm=64, bands=16, shingle_size=4,
+            max_candidates=4, max_bucket_scan=64
+        )
+        cache.put("How do I reset the password for my account?", "Go to settings.")
+        for i in range(100):
+            cache.put(f"How do I reset the password for my account, item {i}, on the web app?", str(i))
+
+        assert cache.get("how do I reset the password for my acount") == "Go to settings."
+        assert cache.get_stats()["candidates_truncated"] > 0
+
+    def test_signature_is_deterministic(self, cache):
+        """Test that equal text yields equal signatures."""
+        assert cache.signature("reset password") == cache.signature("reset password")
+        assert len(cache.signature("reset password")) == 64
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entry is evicted when full."""
+        cache.put("first question about billing", "1")
+        cache.put("second question about shipping", "2")
+        cache.put("third question about returns", "3")
+        cache.get("first question about billing")
+
+        cache.put("fourth question about warranty", "4")
+
+        assert cache.get("second question about shipping") is None
+        assert cache.get("first question about billing") == "1"
+        stats = cache.get_stats()
+        assert stats["entries"] == 3
+        assert stats["evictions"] == 1
+
+    def test_eviction_cleans_indexes(self):
+        """Test that evicted entries leave no LSH buckets behind."""
+        cache = PromptCache(max_entries=1, num_perm=16, bands=4)
+        cache.put("first question about billing", "1")
+        cache.put("second question about shipping", "2")
+
+        assert len(cache.exact_index) == 1
+        assert len(cache.band_index) == 4
+
+    def test_invalid_band_configuration(self):
+        """Test that bands must divide the number of permutations."""
+        with pytest.raises(ValueError, match="multiple of PROMPT_CACHE_BANDS"):
+            PromptCache(num_perm=64, bands=10)
@@ -0,0 +1,194 @@
+import pytest
+from unittest.mock import patch
+from services.reply_pipeline import (
+    StreamPipeline,
+    TranscriptBuilder,
+    BoundaryChunker,
+    RedactionFilter,
+    MaxLengthCutoff,
+    REDACTION_PATTERNS,
+    create_reply_pipeline
+)
+
+class FakeUpstream:
+    """Async iterator over fixed deltas that records how far it was consumed."""
+
+    def __init__(self, deltas):
+        self.deltas = list(deltas)
+        self.consumed = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed or self.consumed >= len(self.deltas):
+            raise StopAsyncIteration
+        self.consumed += 1
+        return self.deltas[self.consumed - 1]
+
+    async def aclose(self):
+        self.closed = True
+
+async def run(stages, deltas):
+    """Run deltas through a pipeline and collect the output."""
+    upstream = FakeUpstream(deltas)
+    output = [chunk async for chunk in StreamPipeline(stages).run(upstream)]
+    return output, upstream
+
+class TestTranscriptBuilder:
+    """Test cases for TranscriptBuilder."""
+
+    @pytest.mark.asyncio
+    async def test_assembles_full_reply(self):
+        """Test that the transcript holds the whole reply."""
+        transcript = TranscriptBuilder()
+
+        output, _ = await run([transcript], ["Hello", ", ", "world"])
+
+        assert output == ["Hello", ", ", "world"]
+        assert transcript.text == "Hello, world"
+
+class TestBoundaryChunker:
+    """Test cases for BoundaryChunker."""
+
+    @pytest.mark.asyncio
+    async def test_sentence_chunks(self):
+        """Test that text is released at sentence boundaries."""
+        output, _ = await run(
+            [BoundaryChunker("sentence", max_buffer=1000)],
+            ["Hel", "lo there", ". How a", "re you?", " Fine"]
+        )
+
+        assert output == ["Hello there. ", "How are you? ", "Fine"]
+
+    @pytest.mark.asyncio
+    async def test_boundary_split_across_deltas(self):
+        """Test that a boundary spanning two deltas is detected."""
+        output, _ = await run([BoundaryChunker("sentence", max_buffer=1000)], ["One.", " Two"])
+
+        assert output == ["One. ", "Two"]
+
+    @pytest.mark.asyncio
+    async def test_markdown_blocks_keep_code_fences_whole(self):
+        """Test that blank lines inside a code fence are not boundaries."""
+        deltas = ["Intro para", "graph.\n", "\n``", "`py\nx = 1\n\n", "y = 2\n```", "\n\nAfter"]
+
+        output, _ = await run([BoundaryChunker("markdown", max_buffer=1000)], deltas)
+
+        assert output == [
+            "Intro paragraph.\n\n",
+            "```py\nx = 1\n\ny = 2\n```\n\n",
+            "After"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_forced_release_at_max_buffer(self):
+        """Test that held text is released once the buffer limit is reached."""
+        output, _ = await run([BoundaryChunker("sentence", max_buffer=5)], ["abc", "def", "g"])
+
+        assert output == ["abcdef", "g"]
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected."""
+        with pytest.raises(ValueError, match="Unknown chunking mode"):
+            BoundaryChunker("paragraph")
+
+class TestRedactionFilter:
+    """Test cases for RedactionFilter."""
+
+    @pytest.mark.asyncio
+    async def test_redacts_match_split_across_deltas(self):
+        """Test that a match spanning deltas is redacted."""
+        stage = RedactionFilter([REDACTION_PATTERNS["email"]], window=32)
+
+        output, _ = await run([stage], ["Write to jo", "hn.doe@exa", "mple.com for help."])
+
+        assert "".join(output) == "Write to [REDACTED] for help."
+
+    @pytest.mark.asyncio
+    async def test_passes_text_without_matches(self):
+        """Test that text without matches is unchanged."""
+        stage = RedactionFilter([REDACTION_PATTERNS["api_key"]], window=8)
+
+        output, _ = await run([stage], ["Nothing ", "sensitive ", "here."])
+
+        assert "".join(output) == "Nothing sensitive here."
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("delta_size", [1, 2, 3, 5, 7, 13])
+    async def test_streamed_output_matches_whole_text(self, delta_size):
+        """Test that redaction does not depend on how the reply is split."""
+        patterns = list(REDACTION_PATTERNS.values())
+        reply = (
+            "Your tracking number is 12345678901234567890123 and "
+            "the card 4111 1111 1111 1111 was charged. Mail john.doe@example.com "
+            "or use key sk-abcdefghijklmnop1234 today."
+        )
+        deltas = [reply[i:i + delta_size] for i in range(0, len(reply), delta_size)]
+
+        output, _ = await run([RedactionFilter(patterns, window=32)], deltas)
+
+        assert "".join(output) == RedactionFilter(patterns).pattern.sub("[REDACTED]", reply)
+
+class TestMaxLengthCutoff:
+    """Test cases for MaxLengthCutoff."""
+
+    @pytest.mark.asyncio
+    async def test_truncates_and_stops_upstream(self):
+        """Test that the reply is cut at the limit and the upstream is closed."""
+        output, upstream = await run([MaxLengthCutoff(8)], ["Hello", " world", "!", "more"])
+
+        assert "".join(output) == "Hello wo"
+        assert upstream.consumed == 2
+        assert upstream.closed is True
+
+    @pytest.mark.asyncio
+    async def test_cutoff_after_redaction_never_leaks_a_match(self):
+        """Test that the limit counts redacted text, so a cut cannot split a match."""
+        stages = [RedactionFilter([REDACTION_PATTERNS["email"]], window=32), MaxLengthCutoff(12)]
+        deltas = ["Mail ", "alice@", "example.com", " and ", "more ", "text ", "here"]
+
+        output, upstream = await run(stages, deltas)
+
+        assert "".join(output) == "Mail [REDACT"
+        assert "alice" not in "".join(output)
+        # The held-back window lets the upstream run past the limit
+        assert upstream.consumed > 3
+
+class TestCreateReplyPipeline:
+    """Test cases for create_reply_pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_default_pipeline_passes_through(self):
+        """Test that with nothing configured the reply is unchanged."""
+        with patch('services.reply_pipeline.settings') as mock_settings:
+            mock_settings.REPLY_REDACT = ""
+            mock_settings.REPLY_MAX_CHARS = 0
+            mock_settings.REPLY_CHUNKING = "none"
+            transcript = TranscriptBuilder()
+            pipeline = create_reply_pipeline(transcript)
+
+        output = [chunk async for chunk in pipeline.run(FakeUpstream(["a", "b"]))]
+
+        assert output == ["a", "b"]
+        assert transcript.text == "ab"
+
+    @pytest.mark.asyncio
+    async def test_configured_stages(self):
+        """Test that redaction, cutoff and chunking are built from settings."""
+        with patch('services.reply_pipeline.settings') as mock_settings:
+            mock_settings.REPLY_REDACT = "email"
+            mock_settings.REPLY_REDACT_WINDOW = 32
+            mock_settings.REPLY_MAX_CHARS = 100
+            mock_settings.REPLY_CHUNKING = "sentence"
+            mock_settings.REPLY_CHUNK_MAX_BUFFER = 1000
+            pipeline = create_reply_pipeline()
+
+        assert [type(stage) for stage in pipeline.stages] == [
+            RedactionFilter, MaxLengthCutoff, BoundaryChunker
+        ]
+
+        output = [chunk async for chunk in pipeline.run(FakeUpstream(["Mail a@b.io now. ", "Bye"]))]
+
+        assert "".join(output) == "Mail [REDACTED] now. Bye"
@@ -0,0 +1,102 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+import uvicorn
+from server import DrainingServer, build_config
+from websocket_manager import websocket_manager
+
+class TestBuildConfig:
+    """Test cases for build_config."""
+
+    def test_config_from_settings(self):
+        """Test that server tuning is taken from settings."""
+        with patch('server.settings') as mock_settings:
+            mock_settings.HOST = "127.0.0.1"
+            mock_settings.PORT = 9000
+            mock_settings.SERVER_WORKERS = 4
+            mock_settings.SERVER_LOOP = "uvloop"
+            mock_settings.SERVER_HTTP = "httptools"
+            mock_settings.SERVER_BACKLOG = 4096
+            mock_settings.SERVER_KEEP_ALIVE = 15
+            mock_settings.SERVER_DRAIN_TIMEOUT = 45.0
+            mock_settings.WS_PER_MESSAGE_DEFLATE = False
+            mock_settings.SERVER_LOG_LEVEL = "warning"
+
+            config = build_config()
+
+        assert config.workers == 4
+        assert config.loop == "uvloop"
+        assert config.http == "httptools"
+        assert config.backlog == 4096
+        assert config.timeout_keep_alive == 15
+        assert config.timeout_graceful_shutdown == 45.0
+        assert config.ws_per_message_deflate is False
+        assert config.reload is False
+
+class TestDrainingServer:
+    """Test cases for DrainingServer.drain."""
+
+    @pytest.fixture
+    def server(self):
+        """Create a DrainingServer and reset the shared manager afterwards."""
+        yield DrainingServer(uvicorn.Config("main:app"))
+        websocket_manager.draining = False
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_active_streams(self, server):
+        """Test that draining waits until in-flight replies finish."""
+        task = websocket_manager.start_stream("c1", "s1", asyncio.sleep(0.2))
+
+        with patch('server.settings') as mock_settings:
+            mock_settings.SERVER_DRAIN_TIMEOUT = 5
+            await server.drain()
+
+        assert task.done()
+        assert websocket_manager.draining is True
+
+    @pytest.mark.asyncio
+    async def test_drain_stops_at_deadline(self, server):
+        """Test that draining gives up once the deadline passes."""
+        task = websocket_manager.start_stream("c1", "s1", asyncio.sleep(10))
+
+        with patch('server.settings') as mock_settings:
+            mock_settings.SERVER_DRAIN_TIMEOUT = 0.2
+            await server.drain()
+
+        assert not task.done()
+        task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_stalled_client_does_not_block_drain(self, server):
+        """Test that a client that stopped reading cannot hold up the drain."""
+        async def never_read(_):
+            await asyncio.sleep(10)
+
+        stalled = AsyncMock()
+        stalled.send_text.side_effect = never_read
+        responsive = AsyncMock()
+        websocket_manager.active_connections.update({"stalled": stalled, "responsive": responsive})
+
+        try:
+            with patch('server.settings') as mock_settings:
+                mock_settings.SERVER_DRAIN_TIMEOUT = 0.3
+                with patch.object(websocket_manager, 'get_active_stream_count', return_value=0):
+                    remaining = await asyncio.wait_for(server.drain(), timeout=2)
+        finally:
+            websocket_manager.active_connections.pop("stalled", None)
+            websocket_manager.active_connections.pop("responsive", None)
+
+        responsive.send_text.assert_awaited_once()
+        assert remaining == 0.0
+
+    @pytest.mark.asyncio
+    async def test_shutdown_shares_drain_deadline(self, server):
+        """Test that uvicorn's graceful shutdown only gets the time left by the drain."""
+        with patch('server.settings') as mock_settings, \
+             patch('uvicorn.Server.shutdown', new=AsyncMock()), \
+             patch.object(websocket_manager, 'get_active_stream_count', return_value=0):
+            mock_settings.SERVER_DRAIN_TIMEOUT = 5
+            server.servers = []
+            await server.shutdown()
+
+        assert 4 < server.config.timeout_graceful_shutdown <= 5
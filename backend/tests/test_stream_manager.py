@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import patch
+from stream_manager import StreamManager, ReplayStream
+
+class FakeConnectionManager:
+    """Connection manager double recording delivered messages per connection."""
+
+    def __init__(self):
+        self.active = set()
+        self.sent = {}
+
+    async def send_personal_message(self, connection_id, message):
+        if connection_id not in self.active:
+            return False
+        self.sent.setdefault(connection_id, []).append(message)
+        return True
+
+def chunk(content, is_complete=False):
+    """Build a chunk payload."""
+    return {"content": content, "is_complete": is_complete}
+
+class TestReplayStream:
+    """Test cases for ReplayStream."""
+
+    def test_append_assigns_sequence_numbers(self):
+        """Test that chunks get increasing sequence numbers and the stream ID."""
+        stream = ReplayStream("s1", "c1", "conv-1")
+
+        first = stream.append(chunk("a"))
+        second = stream.append(chunk("b"))
+
+        assert first.data["seq"] == 1
+        assert second.data["seq"] == 2
+        assert second.data["stream_id"] == "s1"
+        assert second.data["stream_index"] == 0
+        assert second.conversation_id == "conv-1"
+
+    def test_buffer_is_bounded(self):
+        """Test that only the newest chunks are retained."""
+        stream = ReplayStream("s1", "c1", max_chunks=3)
+        for i in range(5):
+            stream.append(chunk(str(i)))
+
+        assert stream.first_seq == 3
+        assert [m.data["seq"] for m in stream.chunks_after(0)] == [3, 4, 5]
+        assert [m.data["seq"] for m in stream.chunks_after(4)] == [5]
+
+    def test_completion_marks_stream(self):
+        """Test that a completion chunk marks the stream complete."""
+        stream = ReplayStream("s1", "c1")
+        stream.append(chunk("", is_complete=True))
+
+        assert stream.is_complete is True
+        assert stream.completed_at is not None
+
+class TestStreamManager:
+    """Test cases for StreamManager."""
+
+    @pytest.fixture
+    def connections(self):
+        """Fake connection manager with two known connections."""
+        fake = FakeConnectionManager()
+        fake.active.add("old")
+        return fake
+
+    @pytest.fixture
+    def manager(self, connections):
+        """Create a StreamManager with a small buffer."""
+        return StreamManager(connections, max_chunks=10, grace_seconds=60)
+
+    @pytest.mark.asyncio
+    async def test_publish_delivers_to_attached_connection(self, manager, connections):
+        """Test that published chunks are delivered in order."""
+        stream = manager.create_stream("old")
+
+        await manager.publish(stream, chunk("a"))
+        await manager.publish(stream, chunk("b"))
+
+        assert [m.data["content"] for m in connections.sent["old"]] == ["a", "b"]
+        assert stream.delivered_seq == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_chunks_and_live_tail(self, manager, connections):
+        """Test that a reconnecting client receives missed chunks then new ones."""
+        stream = manager.create_stream("old")
+        await manager.publish(stream, chunk("a"))
+
+        # Connection drops; generation continues into the buffer
+        connections.active.discard("old")
+        await manager.publish(stream, chunk("b"))
+        await manager.publish(stream, chunk("c"))
+
+        connections.active.add("new")
+        resumed = await manager.resume(stream.stream_id, "new", last_seq=1)
+        await manager.publish(stream, chunk("", is_complete=True))
+
+        assert resumed is True
+        assert [m.data["seq"] for m in connections.sent["new"]] == [2, 3, 4]
+        assert connections.sent["new"][-1].data["is_complete"] is True
+
+    @pytest.mark.asyncio
+    async def test_resume_unknown_stream(self, manager):
+        """Test that resuming an unknown stream fails."""
+        assert await manager.resume("missing", "new", last_seq=0) is False
+
+    @pytest.mark.asyncio
+    async def test_resume_fails_when_chunks_evicted(self, connections):
+        """Test that resume fails if missed chunks are no longer buffered."""
+        manager = StreamManager(connections, max_chunks=2, grace_seconds=60)
+        stream = manager.create_stream("old")
+        connections.active.discard("old")
+        for content in "abcd":
+            await manager.publish(stream, chunk(content))
+
+        connections.active.add("new")
+
+        assert await manager.resume(stream.stream_id, "new", last_seq=1) is False
+        assert await manager.resume(stream.stream_id, "new", last_seq=2) is True
+        assert [m.data["seq"] for m in connections.sent["new"]] == [3, 4]
+
+    @pytest.mark.asyncio
+    async def test_completed_streams_expire_after_grace_period(self, manager):
+        """Test that completed streams are purged after the grace period."""
+        stream = manager.create_stream("old")
+        await manager.publish(stream, chunk("", is_complete=True))
+
+        assert manager.get_stream(stream.stream_id) is stream
+
+        with patch("stream_manager.time.monotonic", return_value=stream.completed_at + 61):
+            assert manager.get_stream(stream.stream_id) is None
+        assert manager.get_stream_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_incomplete_streams_are_kept(self, manager):
+        """Test that in-flight streams are never purged."""
+        stream = manager.create_stream("old")
+
+        with patch("stream_manager.time.monotonic", return_value=10 ** 9):
+            assert manager.get_stream(stream.stream_id) is stream
@@ -0,0 +1,110 @@
+import pytest
+from services.usage_tracker import (
+    UsageTracker,
+    BudgetExceededError,
+    estimate_tokens,
+    estimate_message_tokens
+)
+
+def make_tracker(**overrides):
+    """Build a tracker with budgets disabled unless overridden."""
+    options = {
+        "max_tokens_per_request": 1000,
+        "conversation_budget": 0,
+        "connection_budget": 0,
+        "global_budget": 0,
+        "max_tracked": 100
+    }
+    options.update(overrides)
+    return UsageTracker(**options)
+
+class TestEstimates:
+    """Test cases for the local token estimates."""
+
+    def test_estimate_tokens(self):
+        """Test that text is estimated at about four characters per token."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+    def test_estimate_message_tokens(self):
+        """Test that each message adds a fixed overhead."""
+        messages = [{"role": "user", "content": "abcd"}, {"role": "user", "content": ""}]
+
+        assert estimate_message_tokens(messages) == 1 + 4 + 0 + 4
+
+class TestUsageTracker:
+    """Test cases for UsageTracker."""
+
+    def test_records_usage_per_scope(self):
+        """Test that usage is aggregated per conversation, connection and globally."""
+        tracker = make_tracker()
+
+        reservation = tracker.reserve(10, conversation_id="conv-1", connection_id="c1")
+        tracker.record(reservation, 10, 20)
+        reservation = tracker.reserve(5, conversation_id="conv-2", connection_id="c1")
+        tracker.record(reservation, 5, 5, estimated=True)
+
+        assert tracker.get_usage(conversation_id="conv-1")["total_tokens"] == 30
+        assert tracker.get_usage(connection_id="c1")["total_tokens"] == 40
+        assert tracker.get_usage()["requests"] == 2
+        assert tracker.get_usage()["estimated_requests"] == 1
+        assert tracker.global_totals.reserved == 0
+
+    def test_max_tokens_clamped_to_remaining_budget(self):
+        """Test that max_tokens shrinks to what the budget still allows."""
+        tracker = make_tracker(conversation_budget=100)
+
+        reservation = tracker.reserve(30, conversation_id="conv-1")
+        assert reservation.max_tokens == 70
+
+        tracker.record(reservation, 30, 40)
+        reservation = tracker.reserve(10, conversation_id="conv-1")
+        assert reservation.max_tokens == 20
+
+    def test_rejects_when_budget_exhausted(self):
+        """Test that a request is rejected once the budget cannot fit a reply."""
+        tracker = make_tracker(global_budget=50)
+
+        reservation = tracker.reserve(10)
+        tracker.record(reservation, 10, 40)
+
+        with pytest.raises(BudgetExceededError, match="global"):
+            tracker.reserve(1)
+        assert tracker.rejected_requests == 1
+
+    def test_reservations_count_against_concurrent_requests(self):
+        """Test that in-flight reservations stop concurrent requests overshooting."""
+        tracker = make_tracker(connection_budget=100, max_tokens_per_request=40)
+
+        first = tracker.reserve(10, connection_id="c1")
+        second = tracker.reserve(10, connection_id="c1")
+
+        assert second.max_tokens == 40
+        with pytest.raises(BudgetExceededError, match="connection"):
+            tracker.reserve(10, connection_id="c1")
+
+        tracker.record(first, 0, 0)
+        tracker.record(second, 0, 0)
+        assert tracker.reserve(10, connection_id="c1").max_tokens == 40
+
+    def test_evicts_least_recently_used_scopes(self):
+        """Test that tracked conversations are bounded."""
+        tracker = make_tracker(max_tracked=2)
+
+        for conversation_id in ("a", "b", "a", "c"):
+            tracker.record(tracker.reserve(1, conversation_id=conversation_id), 1, 1)
+
+        assert list(tracker.conversations) == ["a", "c"]
+
+    def test_snapshot_lists_heaviest_conversations(self):
+        """Test that snapshots report the top conversations by tokens."""
+        tracker = make_tracker()
+        for conversation_id, tokens in (("a", 5), ("b", 50), ("c", 20)):
+            tracker.record(tracker.reserve(1, conversation_id=conversation_id), tokens, 0)
+
+        snapshot = tracker.take_snapshot(top=2)
+
+        assert [entry["id"] for entry in snapshot["top_conversations"]] == ["b", "c"]
+        assert snapshot["global"]["total_tokens"] == 75
+        assert tracker.last_snapshot is snapshot
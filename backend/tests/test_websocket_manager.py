@@ -0,0 +1,118 @@
+import pytest
+import asyncio
+from websocket_manager import WebSocketManager
+
+class TestWebSocketManagerStreams:
+    """Test cases for per-stream generation tracking in WebSocketManager."""
+
+    @pytest.fixture
+    def manager(self):
+        """Create a WebSocketManager with no connections."""
+        return WebSocketManager()
+
+    @pytest.mark.asyncio
+    async def test_start_stream_tracks_until_finished(self, manager):
+        """Test that a stream counts against its connection until it finishes."""
+        release = asyncio.Event()
+
+        task = manager.start_stream("c1", "s1", release.wait())
+        await asyncio.sleep(0)
+
+        assert manager.get_stream_count("c1") == 1
+
+        release.set()
+        await task
+        await asyncio.sleep(0)
+
+        assert manager.get_stream_count("c1") == 0
+        assert "s1" not in manager.stream_tasks
+
+    @pytest.mark.asyncio
+    async def test_streams_run_concurrently(self, manager):
+        """Test that several streams on one connection run at the same time."""
+        started = []
+        release = asyncio.Event()
+
+        async def generation(name):
+            started.append(name)
+            await release.wait()
+
+        tasks = [manager.start_stream("c1", f"s{i}", generation(i)) for i in range(3)]
+        await asyncio.sleep(0)
+
+        assert sorted(started) == [0, 1, 2]
+        assert manager.get_stream_count("c1") == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_cancel_stream_only_for_owner(self, manager):
+        """Test that only the owning connection can cancel a stream."""
+        task = manager.start_stream("c1", "s1", asyncio.sleep(10))
+
+        assert manager.cancel_stream("c2", "s1") is False
+        assert manager.cancel_stream("c1", "s1") is True
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert manager.cancel_stream("c1", "missing") is False
+
+    @pytest.mark.asyncio
+    async def test_attach_stream_transfers_ownership(self, manager):
+        """Test that a resumed stream moves to the new connection."""
+        task = manager.start_stream("old", "s1", asyncio.sleep(10))
+
+        manager.attach_stream("new", "s1")
+
+        assert manager.get_stream_count("old") == 0
+        assert manager.get_stream_count("new") == 1
+        assert manager.cancel_stream("old", "s1") is False
+        assert manager.cancel_stream("new", "s1") is True
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    @pytest.mark.asyncio
+    async def test_disconnect_keeps_generation_running(self, manager):
+        """Test that dropping a connection does not cancel its generations."""
+        release = asyncio.Event()
+        task = manager.start_stream("c1", "s1", release.wait())
+
+        await manager.disconnect("c1")
+        await asyncio.sleep(0)
+
+        assert not task.done()
+        assert manager.get_stream_count("c1") == 0
+
+        release.set()
+        await task
+
+    @pytest.mark.asyncio
+    async def test_orphaned_generations_still_count_as_active(self, manager):
+        """Test that reconnecting frees the per-connection slot but not the process-wide count."""
+        release = asyncio.Event()
+        manager.start_stream("c1", "s1", release.wait())
+
+        await manager.disconnect("c1")
+
+        assert manager.has_stream_capacity("c2", max_streams=1) is True
+        assert manager.get_active_stream_count() == 1
+
+        release.set()
+        await asyncio.sleep(0)
+
+    @pytest.mark.asyncio
+    async def test_resume_respects_stream_limit(self, manager):
+        """Test that taking over a running reply counts against the connection's limit."""
+        release = asyncio.Event()
+        manager.start_stream("old", "s1", release.wait())
+        manager.start_stream("new", "s2", release.wait())
+
+        assert manager.has_stream_capacity("new", max_streams=1, stream_id="s1") is False
+        assert manager.has_stream_capacity("new", max_streams=1, stream_id="s2") is True
+        assert manager.has_stream_capacity("new", max_streams=2, stream_id="s1") is True
+        assert manager.has_stream_capacity("new", max_streams=1, stream_id="finished") is True
+
+        release.set()
+        await asyncio.sleep(0)
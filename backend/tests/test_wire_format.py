@@ -0,0 +1,150 @@
+import pytest
+import json
+from models import WebSocketMessage
+from wire_format import (
+    JsonCodec,
+    CompactCodec,
+    MessagePackCodec,
+    negotiate_codec,
+    msgpack
+)
+
+def chunk_message(content="Hello", is_complete=False, seq=7, stream_index=3, **extra):
+    """Build a reply chunk message."""
+    return WebSocketMessage(
+        type="message",
+        data={
+            "content": content,
+            "is_complete": is_complete,
+            "timestamp": "2023-01-01T00:00:00",
+            "stream_id": f"s{stream_index}",
+            "stream_index": stream_index,
+            "seq": seq,
+            **extra
+        },
+        conversation_id="conv-123"
+    )
+
+class TestJsonCodec:
+    """Test cases for JsonCodec."""
+
+    def test_encode_is_json_text(self):
+        """Test that the default codec keeps the JSON text format."""
+        frame = JsonCodec().encode(chunk_message())
+
+        assert isinstance(frame, str)
+        assert json.loads(frame)["data"]["content"] == "Hello"
+
+    def test_decode(self):
+        """Test decoding a JSON text frame."""
+        assert JsonCodec().decode('{"type": "ping"}') == {"type": "ping"}
+
+class TestCompactCodec:
+    """Test cases for CompactCodec."""
+
+    def test_chunk_round_trip(self):
+        """Test that a chunk encodes to header plus content and decodes back."""
+        codec = CompactCodec(compression_threshold=0)
+
+        frame = codec.encode(chunk_message("Héllo", is_complete=True, seq=42))
+
+        assert isinstance(frame, bytes)
+        assert len(frame) == CompactCodec.HEADER.size + len("Héllo".encode("utf-8"))
+        assert codec.decode(frame) == {
+            "type": "message",
+            "data": {"content": "Héllo", "is_complete": True, "stream_index": 3, "seq": 42}
+        }
+
+    def test_concurrent_streams_round_trip(self):
+        """Test that chunks of two concurrent streams stay distinguishable."""
+        codec = CompactCodec(compression_threshold=0)
+
+        first = codec.encode(chunk_message("hi", seq=1, stream_index=1))
+        second = codec.encode(chunk_message("hi", seq=1, stream_index=2))
+
+        assert first != second
+        assert codec.decode(first)["data"]["stream_index"] == 1
+        assert codec.decode(second)["data"]["stream_index"] == 2
+
+    def test_completion_with_extra_fields_is_control_frame(self):
+        """Test that completion fields the header cannot carry are preserved."""
+        codec = CompactCodec(compression_threshold=0)
+
+        frame = codec.encode(chunk_message("", is_complete=True, cancelled=True))
+
+        assert frame[0] == CompactCodec.KIND_CONTROL
+        decoded = codec.decode(frame)
+        assert decoded["data"]["cancelled"] is True
+        assert decoded["data"]["stream_id"] == "s3"
+
+    def test_control_frame_round_trip(self):
+        """Test that non-chunk messages are carried as JSON control frames."""
+        codec = CompactCodec(compression_threshold=0)
+        message = WebSocketMessage(type="status", data={"status": "processing"})
+
+        decoded = codec.decode(codec.encode(message))
+
+        assert decoded["type"] == "status"
+        assert decoded["data"] == {"status": "processing"}
+
+    def test_payload_above_threshold_is_deflated(self):
+        """Test that large payloads are compressed and flagged."""
+        codec = CompactCodec(compression_threshold=64)
+        content = "repeat " * 100
+
+        frame = codec.encode(chunk_message(content))
+
+        assert frame[1] & CompactCodec.FLAG_DEFLATED
+        assert len(frame) < len(content)
+        assert codec.decode(frame)["data"]["content"] == content
+
+    def test_payload_below_threshold_is_not_deflated(self):
+        """Test that small payloads are sent uncompressed."""
+        codec = CompactCodec(compression_threshold=64)
+
+        frame = codec.encode(chunk_message("short"))
+
+        assert not frame[1] & CompactCodec.FLAG_DEFLATED
+
+    def test_decode_accepts_json_text(self):
+        """Test that clients may still send JSON text frames."""
+        assert CompactCodec().decode('{"type": "ping"}') == {"type": "ping"}
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+class TestMessagePackCodec:
+    """Test cases for MessagePackCodec."""
+
+    def test_round_trip(self):
+        """Test that a message survives MessagePack encoding."""
+        codec = MessagePackCodec()
+        message = chunk_message()
+
+        frame = codec.encode(message)
+
+        assert isinstance(frame, bytes)
+        assert codec.decode(frame) == message.dict()
+
+class TestNegotiateCodec:
+    """Test cases for negotiate_codec."""
+
+    def test_defaults_to_json(self):
+        """Test that JSON is used when no subprotocol is offered."""
+        codec = negotiate_codec([])
+
+        assert isinstance(codec, JsonCodec)
+        assert codec.subprotocol is None
+
+    def test_unknown_subprotocol_falls_back_to_json(self):
+        """Test that unknown subprotocols are ignored."""
+        assert negotiate_codec(["chat.unknown"]).subprotocol is None
+
+    def test_client_preference_order(self):
+        """Test that the first supported subprotocol offered wins."""
+        assert negotiate_codec(["chat.unknown", "chat.compact"]).subprotocol == "chat.compact"
+
+    @pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+    def test_msgpack_selected(self):
+        """Test that MessagePack can be negotiated."""
+        codec = negotiate_codec(["chat.msgpack", "chat.compact"])
+
+        assert isinstance(codec, MessagePackCodec)
@@ -1,8 +1,13 @@
+import asyncio
 import json
 import uuid
-from typing import Dict, Set
+from typing import Coroutine, Dict, Set
 from fastapi import WebSocket, WebSocketDisconnect
 from models import WebSocketMessage, ConnectionStatus
+from wire_format import JsonCodec, negotiate_codec
+from logging_config import get_logger
+
+logger = get_logger("websocket_manager")
 
 class WebSocketManager:
     """Manages WebSocket connections and message routing."""
@@ -11,11 +16,20 @@ class WebSocketManager:
         """Initialize the WebSocket manager."""
         self.active_connections: Dict[str, WebSocket] = {}
         self.conversation_connections: Dict[str, Set[str]] = {}
+        self.connection_codecs: Dict[str, JsonCodec] = {}
+        self.send_locks: Dict[str, asyncio.Lock] = {}
+        self.stream_tasks: Dict[str, asyncio.Task] = {}
+        self.stream_owners: Dict[str, str] = {}
+        self.connection_streams: Dict[str, Set[str]] = {}
+        self.draining = False
     
     async def connect(self, websocket: WebSocket, conversation_id: str = None) -> str:
         """
         Accept a new WebSocket connection.
         
+        The wire format is negotiated from the subprotocols offered by the
+        client; plain JSON text frames are used when none is offered.
+        
         Args:
             websocket: The WebSocket connection
             conversation_id: Optional conversation ID for grouping connections
@@ -23,11 +37,15 @@ class WebSocketManager:
         Returns:
             str: The connection ID
         """
-        await websocket.accept()
+        codec = negotiate_codec(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=codec.subprotocol)
         
         # Generate unique connection ID
         connection_id = str(uuid.uuid4())
         self.active_connections[connection_id] = websocket
+        self.connection_codecs[connection_id] = codec
+        self.send_locks[connection_id] = asyncio.Lock()
+        self.connection_streams[connection_id] = set()
         
         # Add to conversation group if provided
         if conversation_id:
@@ -61,6 +79,11 @@ class WebSocketManager:
         """
         if connection_id in self.active_connections:
             del self.active_connections[connection_id]
+        self.connection_codecs.pop(connection_id, None)
+        self.send_locks.pop(connection_id, None)
+        
+        # In-flight generations keep running so a reconnecting client can resume them
+        self.connection_streams.pop(connection_id, None)
         
         # Remove from conversation groups
         for conversation_id, connections in self.conversation_connections.items():
@@ -69,24 +92,166 @@ class WebSocketManager:
                 if not connections:
                     del self.conversation_connections[conversation_id]
     
-    async def send_personal_message(self, connection_id: str, message: WebSocketMessage):
+    def get_codec(self, connection_id: str) -> JsonCodec:
+        """
+        Get the wire codec negotiated for a connection.
+        
+        Args:
+            connection_id: The connection ID
+            
+        Returns:
+            JsonCodec: The connection's codec
+        """
+        return self.connection_codecs.get(connection_id) or JsonCodec()
+    
+    async def _send(self, connection_id: str, message: WebSocketMessage):
+        """
+        Encode a message with the connection's codec and send it.
+        
+        Sends are serialized per connection because several streams may
+        deliver chunks to the same socket concurrently.
+        """
+        frame = self.get_codec(connection_id).encode(message)
+        websocket = self.active_connections[connection_id]
+        async with self.send_locks.setdefault(connection_id, asyncio.Lock()):
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+    
+    def start_stream(self, connection_id: str, stream_id: str, generation: Coroutine) -> asyncio.Task:
+        """
+        Run a reply generation for a connection as a background task.
+        
+        Args:
+            connection_id: The connection that owns the stream
+            stream_id: The stream ID
+            generation: Coroutine producing the reply
+            
+        Returns:
+            asyncio.Task: The running generation
+        """
+        task = asyncio.create_task(generation)
+        self.stream_tasks[stream_id] = task
+        self.stream_owners[stream_id] = connection_id
+        self.connection_streams.setdefault(connection_id, set()).add(stream_id)
+        task.add_done_callback(lambda _: self._finish_stream(stream_id))
+        return task
+    
+    def _finish_stream(self, stream_id: str):
+        """Forget a generation once it has finished."""
+        self.stream_tasks.pop(stream_id, None)
+        owner = self.stream_owners.pop(stream_id, None)
+        if owner in self.connection_streams:
+            self.connection_streams[owner].discard(stream_id)
+    
+    def attach_stream(self, connection_id: str, stream_id: str):
+        """
+        Transfer ownership of a running generation to a connection.
+        
+        Args:
+            connection_id: The connection taking over the stream
+            stream_id: The stream ID
+        """
+        if stream_id not in self.stream_tasks:
+            return
+        
+        previous_owner = self.stream_owners.get(stream_id)
+        if previous_owner in self.connection_streams:
+            self.connection_streams[previous_owner].discard(stream_id)
+        
+        self.stream_owners[stream_id] = connection_id
+        self.connection_streams.setdefault(connection_id, set()).add(stream_id)
+    
+    def cancel_stream(self, connection_id: str, stream_id: str) -> bool:
+        """
+        Cancel a generation owned by a connection.
+        
+        Args:
+            connection_id: The connection requesting the cancellation
+            stream_id: The stream to cancel
+            
+        Returns:
+            bool: True if a running generation was cancelled
+        """
+        if self.stream_owners.get(stream_id) != connection_id:
+            return False
+        
+        self.stream_tasks[stream_id].cancel()
+        return True
+    
+    def has_stream_capacity(self, connection_id: str, max_streams: int, stream_id: str = None) -> bool:
+        """
+        Check whether a connection may take on another running generation.
+        
+        Args:
+            connection_id: The connection ID
+            max_streams: Maximum running generations per connection
+            stream_id: Optional stream the connection wants to take over
+            
+        Returns:
+            bool: True if the connection is below its limit, or the stream
+                is finished or already owned by the connection
+        """
+        if stream_id is not None and (
+            stream_id not in self.stream_tasks
+            or self.stream_owners.get(stream_id) == connection_id
+        ):
+            return True
+        return self.get_stream_count(connection_id) < max_streams
+    
+    def get_stream_count(self, connection_id: str) -> int:
+        """
+        Get the number of generations running for a connection.
+        
+        Args:
+            connection_id: The connection ID
+            
+        Returns:
+            int: Number of in-flight streams owned by the connection
+        """
+        return len(self.connection_streams.get(connection_id, ()))
+    
+    def decode_frame(self, connection_id: str, frame: dict) -> dict:
+        """
+        Decode a received ASGI WebSocket frame with the connection's codec.
+        
+        Args:
+            connection_id: The connection ID
+            frame: The frame returned by WebSocket.receive()
+            
+        Returns:
+            dict: The decoded message
+        """
+        data = frame.get("text")
+        if data is None:
+            data = frame.get("bytes")
+        return self.get_codec(connection_id).decode(data)
+    
+    async def send_personal_message(self, connection_id: str, message: WebSocketMessage) -> bool:
         """
         Send a message to a specific connection.
         
         Args:
             connection_id: The target connection ID
             message: The message to send
+            
+        Returns:
+            bool: True if the message was sent
         """
         if connection_id in self.active_connections:
             try:
-                await self.active_connections[connection_id].send_text(
-                    message.json()
-                )
+                await self._send(connection_id, message)
+                return True
             except WebSocketDisconnect:
                 await self.disconnect(connection_id)
             except Exception as e:
-                print(f"Error sending message to {connection_id}: {e}")
+                logger.warning(
+                    "Error sending message: %s", e,
+                    extra={"connection_id": connection_id, "conversation_id": message.conversation_id}
+                )
                 await self.disconnect(connection_id)
+        return False
     
     async def send_to_conversation(self, conversation_id: str, message: WebSocketMessage):
         """
@@ -101,13 +266,14 @@ class WebSocketManager:
             
             for connection_id in self.conversation_connections[conversation_id]:
                 try:
-                    await self.active_connections[connection_id].send_text(
-                        message.json()
-                    )
+                    await self._send(connection_id, message)
                 except WebSocketDisconnect:
                     connections_to_remove.append(connection_id)
                 except Exception as e:
-                    print(f"Error sending message to {connection_id}: {e}")
+                    logger.warning(
+                        "Error sending message: %s", e,
+                        extra={"connection_id": connection_id, "conversation_id": conversation_id}
+                    )
                     connections_to_remove.append(connection_id)
             
             # Clean up disconnected connections
@@ -123,19 +289,50 @@ class WebSocketManager:
         """
         connections_to_remove = []
         
-        for connection_id, websocket in self.active_connections.items():
+        async def send(connection_id: str):
             try:
-                await websocket.send_text(message.json())
+                await self._send(connection_id, message)
             except WebSocketDisconnect:
                 connections_to_remove.append(connection_id)
             except Exception as e:
-                print(f"Error broadcasting to {connection_id}: {e}")
+                logger.warning("Error broadcasting: %s", e, extra={"connection_id": connection_id})
                 connections_to_remove.append(connection_id)
         
+        # Send concurrently so one slow client does not delay the others
+        await asyncio.gather(*(send(connection_id) for connection_id in list(self.active_connections)))
+        
         # Clean up disconnected connections
         for connection_id in connections_to_remove:
             await self.disconnect(connection_id)
     
+    async def begin_drain(self):
+        """
+        Stop taking new work and tell clients to reconnect elsewhere.
+        
+        Replies already in flight keep streaming; clients are asked to
+        reconnect once their current reply completes.
+        """
+        self.draining = True
+        await self.broadcast(
+            WebSocketMessage(
+                type="status",
+                data={
+                    "status": "draining",
+                    "message": "Server is restarting; reconnect to continue",
+                    "reconnect": True
+                }
+            )
+        )
+    
+    def get_active_stream_count(self) -> int:
+        """
+        Get the number of generations running across all connections.
+        
+        Returns:
+            int: Number of in-flight streams
+        """
+        return len(self.stream_tasks)
+    
     def get_connection_count(self) -> int:
         """
         Get the number of active connections.
@@ -0,0 +1,171 @@
+import json
+import struct
+import zlib
+from typing import List, Optional, Union
+from config import settings
+from models import WebSocketMessage
+
+try:
+    import msgpack
+except ImportError:  # MessagePack framing is only offered when installed
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+class JsonCodec:
+    """Default codec: every message is a JSON text frame."""
+
+    subprotocol: Optional[str] = None
+
+    def encode(self, message: WebSocketMessage) -> Frame:
+        """
+        Encode a message for the wire.
+
+        Args:
+            message: The message to encode
+
+        Returns:
+            Frame: A text frame
+        """
+        return message.json()
+
+    def decode(self, data: Frame) -> dict:
+        """
+        Decode an incoming client frame.
+
+        Args:
+            data: The text or binary frame payload
+
+        Returns:
+            dict: The decoded message
+        """
+        return json.loads(data)
+
+class MessagePackCodec(JsonCodec):
+    """Binary codec: every message is a MessagePack-encoded frame."""
+
+    subprotocol = "chat.msgpack"
+
+    def encode(self, message: WebSocketMessage) -> Frame:
+        """Encode a message as a MessagePack binary frame."""
+        return msgpack.packb(message.dict())
+
+    def decode(self, data: Frame) -> dict:
+        """Decode a MessagePack binary frame, accepting JSON text as well."""
+        if isinstance(data, str):
+            return json.loads(data)
+        return msgpack.unpackb(data)
+
+class CompactCodec(JsonCodec):
+    """
+    Binary codec with a fixed header for reply chunks.
+
+    Reply chunks are sent as a 10-byte header (kind, flags, stream index, seq)
+    followed by the UTF-8 content. The stream index is announced with the
+    stream and conversation IDs by the "processing" status, so a client can
+    route chunks of concurrent replies; the timestamp is left to the client.
+    Every other message, including completions that carry extra fields such
+    as "cancelled" or "error", is a control frame whose payload is the JSON
+    message. Payloads at or above the compression threshold are zlib-deflated.
+    """
+
+    subprotocol = "chat.compact"
+
+    HEADER = struct.Struct(">BBII")
+    # Chunk fields the header and content represent; anything else needs a control frame
+    CHUNK_FIELDS = frozenset({"content", "is_complete", "timestamp", "stream_id", "stream_index", "seq"})
+    KIND_CONTROL = 0
+    KIND_CHUNK = 1
+    FLAG_COMPLETE = 0x01
+    FLAG_DEFLATED = 0x02
+
+    def __init__(self, compression_threshold: int = None, compression_level: int = None):
+        """
+        Initialize the codec.
+
+        Args:
+            compression_threshold: Minimum payload size in bytes to deflate; 0 disables
+            compression_level: zlib compression level
+        """
+        self.compression_threshold = (
+            compression_threshold if compression_threshold is not None
+            else settings.WS_COMPRESSION_THRESHOLD
+        )
+        self.compression_level = (
+            compression_level if compression_level is not None
+            else settings.WS_COMPRESSION_LEVEL
+        )
+
+    def encode(self, message: WebSocketMessage) -> Frame:
+        """Encode a message as a compact binary frame."""
+        data = message.data
+        if message.type == "message" and "content" in data and self.CHUNK_FIELDS.issuperset(data):
+            kind = self.KIND_CHUNK
+            flags = self.FLAG_COMPLETE if data.get("is_complete") else 0
+            stream_index = data.get("stream_index", 0)
+            seq = data.get("seq", 0)
+            payload = data["content"].encode("utf-8")
+        else:
+            kind = self.KIND_CONTROL
+            flags = 0
+            stream_index = 0
+            seq = 0
+            payload = message.json().encode("utf-8")
+
+        if self.compression_threshold and len(payload) >= self.compression_threshold:
+            payload = zlib.compress(payload, self.compression_level)
+            flags |= self.FLAG_DEFLATED
+
+        return self.HEADER.pack(kind, flags, stream_index, seq) + payload
+
+    def decode(self, data: Frame) -> dict:
+        """Decode a compact control frame, accepting JSON text as well."""
+        if isinstance(data, str):
+            return json.loads(data)
+
+        kind, flags, stream_index, seq = self.HEADER.unpack_from(data)
+        payload = data[self.HEADER.size:]
+        if flags & self.FLAG_DEFLATED:
+            payload = zlib.decompress(payload)
+
+        if kind == self.KIND_CHUNK:
+            return {
+                "type": "message",
+                "data": {
+                    "content": payload.decode("utf-8"),
+                    "is_complete": bool(flags & self.FLAG_COMPLETE),
+                    "stream_index": stream_index,
+                    "seq": seq
+                }
+            }
+        return json.loads(payload)
+
+def available_codecs() -> List[JsonCodec]:
+    """
+    Get the negotiable binary codecs in order of server preference.
+
+    Returns:
+        List[JsonCodec]: Codecs that can be selected by subprotocol
+    """
+    codecs: List[JsonCodec] = [CompactCodec()]
+    if msgpack is not None:
+        codecs.append(MessagePackCodec())
+    return codecs
+
+def negotiate_codec(offered: List[str]) -> JsonCodec:
+    """
+    Pick a codec from the subprotocols offered by the client.
+
+    The client's order of preference wins; JSON is used when nothing matches.
+
+    Args:
+        offered: Subprotocols from the Sec-WebSocket-Protocol header
+
+    Returns:
+        JsonCodec: The codec to use for the connection
+    """
+    codecs = {codec.subprotocol: codec for codec in available_codecs()}
+    for subprotocol in offered:
+        if subprotocol in codecs:
+            return codecs[subprotocol]
+    return JsonCodec()
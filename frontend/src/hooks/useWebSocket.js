@@ -10,6 +10,7 @@ const useWebSocket = (url, onMessage) => {
   const reconnectAttempts = useRef(0);
   const maxReconnectAttempts = Infinity; // Always retry
   const reconnectDelay = 1000; // Start with 1 second
+  const streamRef = useRef(null); // Last in-flight reply, for resuming after reconnect
 
   const connect = useCallback(() => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
@@ -27,6 +28,24 @@ const useWebSocket = (url, onMessage) => {
         ws.addEventListener('message', onMessage);
       }
 
+      // Track stream ID and sequence number of the in-flight reply
+      ws.onmessage = (event) => {
+        try {
+          const message = JSON.parse(event.data);
+          const { stream_id: streamId, seq, is_complete: isComplete } = message.data || {};
+          if (!streamId) return;
+          if (message.type === 'status' && message.data.status === 'processing') {
+            streamRef.current = { streamId, lastSeq: 0, isComplete: false };
+          } else if (message.type === 'message' && seq) {
+            streamRef.current = { streamId, lastSeq: seq, isComplete: !!isComplete };
+          } else if (message.type === 'error') {
+            streamRef.current = null;
+          }
+        } catch (err) {
+          // Non-JSON frames are handled by onMessage
+        }
+      };
+
       ws.onopen = () => {
         console.log('WebSocket connected');
         setIsConnected(true);
@@ -34,6 +53,16 @@ const useWebSocket = (url, onMessage) => {
         setHasEverConnected(true);
         setError(null);
         reconnectAttempts.current = 0;
+
+        // Continue a reply that was interrupted by the disconnect
+        const stream = streamRef.current;
+        if (stream && !stream.isComplete) {
+          ws.send(JSON.stringify({
+            type: 'resume',
+            stream_id: stream.streamId,
+            last_seq: stream.lastSeq
+          }));
+        }
       };
 
       ws.onclose = (event) => {